@@ -41,6 +41,7 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'mysite.timing.TimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,6 +80,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # A file rather than the in-memory default, so that tests can use
+        # more than one connection at a time.
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
@@ -101,3 +107,44 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/1.8/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Polls
+
+# Buffer votes in memory and write them in batches, rather than updating
+# the database on every vote. See polls/votes.py.
+POLLS_BUFFER_VOTES = False
+
+POLLS_VOTE_FLUSH_SIZE = 100
+
+POLLS_VOTE_FLUSH_INTERVAL = 1.0
+
+# How long, in seconds, a cached results page may be served for before it
+# is rebuilt. Votes rebuild it straight away.
+POLLS_RESULTS_CACHE_TIMEOUT = 5
+
+# The cached index is rebuilt whenever a question is saved or deleted, or a
+# scheduled one becomes due. This bounds how long changes made without
+# saving, like `QuerySet.update`, take to appear. See polls/latest.py.
+POLLS_INDEX_CACHE_TIMEOUT = 60
+
+
+# Per-request timings (see mysite/timing.py): database time and query count,
+# the timers below, and response rendering, sent back in a `Server-Timing`
+# header and aggregated per view. The histograms are served at
+# TIMING_METRICS_URL (with DEBUG on, to INTERNAL_IPS, or to staff) and, if
+# TIMING_METRICS_FILE is set, written there every TIMING_FLUSH_INTERVAL
+# seconds. Nothing is timed while this is off.
+TIMING_ENABLED = False
+
+TIMING_INSTRUMENT = {
+    'template': (
+        'django.template.backends.django.Template.render',
+    ),
+}
+
+TIMING_METRICS_URL = '/__timing__/'
+
+TIMING_METRICS_FILE = None
+
+TIMING_FLUSH_INTERVAL = 10
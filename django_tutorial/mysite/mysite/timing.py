@@ -0,0 +1,278 @@
+import bisect
+import functools
+import json
+import os
+import tempfile
+import threading
+from importlib import import_module
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+"""
+Where the time goes in each request: database time and query count, plus
+any other timers named in the `TIMING_INSTRUMENT` setting (serializers,
+Pygments, templates), the time spent rendering the response, and the total.
+
+Timers are installed by wrapping the functions they measure when the
+middleware is loaded, so nothing is wrapped unless `TIMING_ENABLED` is on.
+When it is off the middleware raises `MiddlewareNotUsed` and Django drops it
+altogether.
+
+Each response gets a `Server-Timing` header, which browser developer tools
+show alongside the request. The timings are also aggregated into histograms
+per view (and viewset action), served as JSON at `TIMING_METRICS_URL` and
+written to `TIMING_METRICS_FILE`. Both only cover the process they are
+served or written from; put `%(pid)s` in the file name to keep one file per
+worker. The histograms are only served with `DEBUG` on, to `INTERNAL_IPS`,
+or to staff users; anyone else gets the usual 404.
+
+This module is copied in tutorial/tutorial/timing.py and
+django_tutorial/mysite/mysite/timing.py, and the tests of both projects
+fail when the two differ.
+"""
+
+# Every query goes through one of these, whatever else is instrumented.
+DATABASE = ('django.db.backends.utils.CursorWrapper.execute',
+            'django.db.backends.utils.CursorWrapper.executemany')
+
+# Upper bounds of the histogram buckets: milliseconds for timings, and plain
+# numbers for query counts. Anything larger goes in a last, unbounded one.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_local = threading.local()
+
+
+class RequestTimings(object):
+    """
+    The timers of the request being handled on this thread.
+    """
+
+    def __init__(self):
+        self.start = default_timer()
+        self.seconds = {}
+        self.calls = {}
+        self.running = set()
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def metrics(self):
+        """
+        The request's timings in milliseconds, and its query count.
+        """
+        metrics = dict((name, 1000 * seconds)
+                       for name, seconds in self.seconds.items())
+        metrics['queries'] = self.calls.get('db', 0)
+        metrics.setdefault('db', 0)
+        return metrics
+
+
+def timed(name, func):
+    """
+    Wrap `func` to add the time it takes to the `name` timer of the current
+    request. Calls made while the same timer is already running, such as a
+    serializer's `data` calling its parent's, are not counted twice.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = getattr(_local, 'timings', None)
+        if timings is None or name in timings.running:
+            return func(*args, **kwargs)
+        timings.running.add(name)
+        start = default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.running.discard(name)
+            timings.add(name, default_timer() - start)
+    wrapper.timed = name
+    return wrapper
+
+
+def _owner(path):
+    try:
+        return import_module(path)
+    except ImportError:
+        return import_string(path)
+
+
+def instrument(path, name):
+    """
+    Replace the function, method or property named by the dotted `path`
+    with one timed by the `name` timer. Doing so again changes nothing.
+    """
+    owner_path, attr = path.rsplit('.', 1)
+    try:
+        owner = _owner(owner_path)
+        value = vars(owner)[attr]
+    except (ImportError, KeyError):
+        raise ImproperlyConfigured('Cannot time %r: it does not exist.'
+                                   % path)
+    if isinstance(value, property):
+        if getattr(value.fget, 'timed', None):
+            return
+        value = property(timed(name, value.fget), value.fset, value.fdel,
+                         value.__doc__)
+    elif getattr(value, 'timed', None):
+        return
+    else:
+        value = timed(name, value)
+    setattr(owner, attr, value)
+
+
+def install(timers):
+    """
+    Instrument every path of `timers`, a mapping of timer names to dotted
+    paths, as well as the database cursor.
+    """
+    for path in DATABASE:
+        instrument(path, 'db')
+    for name, paths in timers.items():
+        for path in paths:
+            instrument(path, name)
+
+
+class Histograms(object):
+    """
+    Counts of the timings seen for each view, bucketed by `BUCKETS`.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, metrics):
+        with self._lock:
+            histograms = self._data.setdefault(view, {})
+            for name, value in metrics.items():
+                histogram = histograms.get(name)
+                if histogram is None:
+                    histogram = histograms[name] = {
+                        'buckets': [0] * (len(BUCKETS) + 1),
+                        'count': 0, 'sum': 0, 'max': 0}
+                histogram['buckets'][bisect.bisect_left(BUCKETS, value)] += 1
+                histogram['count'] += 1
+                histogram['sum'] += value
+                histogram['max'] = max(histogram['max'], value)
+
+    def snapshot(self):
+        with self._lock:
+            views = json.loads(json.dumps(self._data))
+        return {'buckets': list(BUCKETS) + ['+Inf'], 'views': views}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def write(self, path):
+        """
+        Write a snapshot to `path`, atomically, so that whatever reads it
+        never sees half a file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2, sort_keys=True,
+                      separators=(',', ': '))
+        os.rename(tmp, path)
+
+
+histograms = Histograms()
+
+
+def server_timing(metrics):
+    """
+    The `Server-Timing` header value for one request's metrics.
+    """
+    entries = ['db;dur=%.1f;desc="%d queries"' % (metrics['db'],
+                                                  metrics['queries'])]
+    for name in sorted(metrics):
+        if name not in ('db', 'queries', 'total'):
+            entries.append('%s;dur=%.1f' % (name, metrics[name]))
+    entries.append('total;dur=%.1f' % metrics['total'])
+    return ', '.join(entries)
+
+
+def view_name(request, response):
+    """
+    The URL name of the view that handled `request`, followed by the action
+    for viewsets, like `snippet-detail.retrieve`.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '(unresolved)'
+    context = getattr(response, 'renderer_context', None) or {}
+    action = getattr(context.get('view'), 'action', None)
+    if action:
+        return '%s.%s' % (match.view_name, action)
+    return match.view_name
+
+
+class TimingMiddleware(object):
+    """
+    Put this first in `MIDDLEWARE_CLASSES`, so that its total covers
+    everything the others do too.
+    """
+
+    def __init__(self):
+        if not getattr(settings, 'TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        install(getattr(settings, 'TIMING_INSTRUMENT', {}))
+        self.metrics_url = getattr(settings, 'TIMING_METRICS_URL', None)
+        self.metrics_file = getattr(settings, 'TIMING_METRICS_FILE', None)
+        self.flush_interval = getattr(settings, 'TIMING_FLUSH_INTERVAL', 10)
+        self.flushed = default_timer()
+
+    def is_metrics_request(self, request):
+        return bool(self.metrics_url) and request.path == self.metrics_url
+
+    def can_see_metrics(self, request):
+        """
+        Only served from `process_response`, once the authentication
+        middleware has set `request.user`.
+        """
+        if settings.DEBUG:
+            return True
+        if request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS:
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_active and user.is_staff)
+
+    def process_request(self, request):
+        _local.timings = None
+        if not self.is_metrics_request(request):
+            _local.timings = RequestTimings()
+
+    def process_template_response(self, request, response):
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            start = default_timer()
+
+            def rendered(response):
+                timings.add('render', default_timer() - start)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def process_response(self, request, response):
+        if self.is_metrics_request(request) and self.can_see_metrics(request):
+            return JsonResponse(histograms.snapshot())
+        timings = getattr(_local, 'timings', None)
+        if timings is None:
+            return response
+        _local.timings = None
+        metrics = timings.metrics()
+        metrics['total'] = 1000 * (default_timer() - timings.start)
+        response['Server-Timing'] = server_timing(metrics)
+        histograms.record(view_name(request, response), metrics)
+        if self.metrics_file:
+            now = default_timer()
+            if now - self.flushed >= self.flush_interval:
+                self.flushed = now
+                histograms.write(self.metrics_file % {'pid': os.getpid()})
+        return response
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PollsConfig(AppConfig):
+    name = 'polls'
+
+    def ready(self):
+        # Connects the signal handlers that keep the cached index current.
+        from . import latest  # noqa
@@ -0,0 +1,27 @@
+import datetime
+
+from django.utils import timezone
+from mysite.benchmarking import (benchmark_database, environment,  # noqa
+                                 percentile, query_stats, summary, timings)
+from .models import Choice, Question
+
+"""
+Helpers for the `benchmark` management command, on top of the ones in
+`mysite.benchmarking`.
+"""
+
+
+def create_questions(count, choices=4, batch_size=500):
+    """
+    Bulk insert `count` questions published an hour apart, most recent
+    first, each with `choices` choices.
+    """
+    now = timezone.now()
+    Question.objects.bulk_create(
+        [Question(question_text='Question %d?' % i,
+                  pub_date=now - datetime.timedelta(hours=i + 1))
+         for i in range(count)], batch_size=batch_size)
+    Choice.objects.bulk_create(
+        [Choice(question_id=pk, choice_text='Choice %d' % i)
+         for pk in Question.objects.values_list('pk', flat=True)
+         for i in range(choices)], batch_size=batch_size)
@@ -0,0 +1,64 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Question
+
+"""
+The index page lists the latest published questions, which depends on the
+time as well as the database, so a plain per-view cache could keep
+scheduled questions hidden after they are due. Instead the list is cached
+along with the `pub_date` of the next scheduled question, and is rebuilt
+once that moment passes, or as soon as any question is saved or deleted.
+
+Changes that skip the model signals, such as `QuerySet.update`, show up
+after `POLLS_INDEX_CACHE_TIMEOUT` seconds at the latest.
+"""
+
+CACHE_KEY = 'polls:latest'
+
+
+def build(count=5):
+    """
+    Read the latest `count` published questions, and when the next
+    scheduled question is due, from the database.
+    """
+    now = timezone.now()
+    questions = list(Question.objects.filter(pub_date__lte=now)
+                     .order_by('-pub_date')[:count])
+    due = (Question.objects.filter(pub_date__gt=now).order_by('pub_date')
+           .values_list('pub_date', flat=True).first())
+    return {'questions': questions, 'expires': due}
+
+
+def refresh():
+    """
+    Rebuild and cache the list, until the next question is due.
+    """
+    entry = build()
+    timeout = getattr(settings, 'POLLS_INDEX_CACHE_TIMEOUT', 60)
+    if entry['expires'] is not None:
+        remaining = (entry['expires'] - timezone.now()).total_seconds()
+        timeout = min(timeout, max(1, int(math.ceil(remaining))))
+    cache.set(CACHE_KEY, entry, timeout)
+    return entry
+
+
+def get():
+    """
+    The latest published questions, most recent first.
+    """
+    entry = cache.get(CACHE_KEY)
+    if entry is None or (entry['expires'] is not None and
+                         timezone.now() >= entry['expires']):
+        entry = refresh()
+    return entry['questions']
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate(**kwargs):
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,70 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.urlresolvers import reverse
+from django.test import Client
+from polls import benchmarks
+from polls.models import Choice, Question
+
+
+class Command(BaseCommand):
+    help = ('Measure the latency, throughput and query counts of the polls '
+            'views, with the database seeded at several sizes. Prints JSON '
+            'that can be compared between commits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,1000,10000',
+                            help='Comma separated numbers of questions.')
+        parser.add_argument('--choices', type=int, default=4,
+                            help='Choices per question.')
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--output',
+                            help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        results = {'environment': None, 'runs': options['runs'],
+                   'sizes': {}}
+        for size in sizes:
+            with benchmarks.benchmark_database():
+                results['environment'] = benchmarks.environment()
+                benchmarks.create_questions(size, options['choices'])
+                results['sizes'][str(size)] = self.run(options['runs'])
+        output = json.dumps(results, indent=2, sort_keys=True,
+                            separators=(',', ': '))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def run(self, runs):
+        client = Client()
+        question = Question.objects.order_by('-pub_date')[0]
+        choice = Choice.objects.filter(question=question)[0]
+
+        def get(url):
+            def fetch():
+                response = client.get(url)
+                assert response.status_code == 200, response.status_code
+            return fetch
+
+        def vote():
+            response = client.post(reverse('polls:vote', args=(question.pk,)),
+                                   {'choice': choice.pk})
+            assert response.status_code == 302, response.status_code
+
+        scenarios = [
+            ('index', get(reverse('polls:index'))),
+            ('detail', get(reverse('polls:detail', args=(question.pk,)))),
+            ('results', get(reverse('polls:results', args=(question.pk,)))),
+            ('vote', vote),
+        ]
+        results = {}
+        for name, func in scenarios:
+            cache.clear()
+            # Measuring the queries also warms up the view.
+            result = benchmarks.query_stats(func)
+            result.update(benchmarks.summary(benchmarks.timings(func, runs)))
+            results[name] = result
+        return results
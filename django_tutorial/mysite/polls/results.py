@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import Question
+
+"""
+The results page is read far more often than votes are cast, so it is
+served from a snapshot of the question's vote counts kept in the cache.
+Recording a vote rebuilds the snapshot, and the short
+`POLLS_RESULTS_CACHE_TIMEOUT` bounds how stale it can get after any other
+change.
+"""
+
+
+def cache_key(question_id):
+    return 'polls:results:%s' % question_id
+
+
+def build(question_id):
+    """
+    Read the results for a question from the database, in one query, or
+    return None if there is no such question.
+    """
+    rows = list(Question.objects.filter(pk=question_id)
+                .order_by('choice__id')
+                .values('id', 'question_text', 'choice__id',
+                        'choice__choice_text', 'choice__votes'))
+    if not rows:
+        return None
+    # A question without choices still comes back as one row, of NULLs.
+    choices = [{'id': row['choice__id'],
+                'choice_text': row['choice__choice_text'],
+                'votes': row['choice__votes']}
+               for row in rows if row['choice__id'] is not None]
+    return {
+        'question': {'id': rows[0]['id'],
+                     'question_text': rows[0]['question_text']},
+        'total_votes': sum(choice['votes'] for choice in choices),
+        'choices': choices,
+    }
+
+
+def refresh(question_id):
+    """
+    Rebuild and cache the snapshot for a question.
+    """
+    snapshot = build(question_id)
+    if snapshot is not None:
+        cache.set(cache_key(question_id), snapshot,
+                  getattr(settings, 'POLLS_RESULTS_CACHE_TIMEOUT', 5))
+    return snapshot
+
+
+def get(question_id):
+    """
+    The cached snapshot for a question, or None if there is no such
+    question.
+    """
+    snapshot = cache.get(cache_key(question_id))
+    if snapshot is None:
+        snapshot = refresh(question_id)
+    return snapshot
@@ -1,7 +1,21 @@
 import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
-from django.test import TestCase
-from .models import Question
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from . import latest, results, votes
+from .models import Choice, Question
+from .votes import ShardedCounter, VoteBuffer, record_vote
+from .urls import urlpatterns
+from mysite import timing
 from django.core.urlresolvers import reverse
 
 
@@ -47,6 +61,9 @@ def create_question(question_text, days):
 
 
 class QuestionViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_index_view_with_no_questions(self):
         """
         If no questions exist, an appropriate message should be displayed.
@@ -128,3 +145,413 @@ class QuestionIndexDetailTests(TestCase):
                                    args=(past_question.id,)))
         self.assertContains(response, past_question.question_text,
                             status_code=200)
+
+
+class VoteTests(TransactionTestCase):
+    threads = 8
+    votes_per_thread = 25
+
+    def setUp(self):
+        question = create_question(question_text='Hot poll.', days=-1)
+        self.choice = question.choice_set.create(choice_text='Yes')
+
+    def hammer(self, func):
+        """
+        Call `func` from many threads at once.
+        """
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.votes_per_thread):
+                    func()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def assertVotes(self, expected):
+        self.assertEqual(Choice.objects.get(pk=self.choice.pk).votes,
+                         expected)
+
+    def test_vote_view_counts_vote(self):
+        response = self.client.post(
+            reverse('polls:vote', args=(self.choice.question_id,)),
+            {'choice': self.choice.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertVotes(1)
+
+    def test_concurrent_votes_are_not_lost(self):
+        """
+        Votes cast at the same time from many threads are all counted.
+        """
+        self.hammer(lambda: record_vote(self.choice.pk))
+        self.assertVotes(self.threads * self.votes_per_thread)
+
+    @override_settings(POLLS_BUFFER_VOTES=True)
+    def test_concurrent_buffered_votes_are_not_lost(self):
+        """
+        Buffered votes all reach the database once flushed.
+        """
+        buffer = VoteBuffer(flush_size=30, flush_interval=60)
+        self.hammer(lambda: buffer.add(self.choice.pk))
+        buffer.flush()
+        self.assertVotes(self.threads * self.votes_per_thread)
+
+    def test_threads_are_spread_over_shards(self):
+        counter = ShardedCounter(shards=4)
+        shards = []
+        threads = [threading.Thread(target=lambda: shards.append(
+            counter.shard())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(shards), [0, 0, 1, 1, 2, 2, 3, 3])
+
+    def test_buffered_votes_are_flushed_when_idle(self):
+        """
+        Votes are written after the flush interval, even if no more votes
+        come in to trigger it.
+        """
+        buffer = VoteBuffer(flush_size=30, flush_interval=0.1)
+        buffer.add(self.choice.pk)
+        self.assertVotes(0)
+        time.sleep(0.5)
+        self.assertVotes(1)
+
+
+class ResultsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = create_question(question_text='Colour?', days=-1)
+        self.red = self.question.choice_set.create(choice_text='Red',
+                                                   votes=2)
+        self.blue = self.question.choice_set.create(choice_text='Blue')
+
+    def test_results_are_cached(self):
+        """
+        The results page is built once and then served from the cache.
+        """
+        url = reverse('polls:results', args=(self.question.id,))
+        response = self.client.get(url)
+        self.assertContains(response, 'Red -- 2 votes')
+        self.assertContains(response, '2 votes in total.')
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_vote_refreshes_results(self):
+        self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.client.post(reverse('polls:vote', args=(self.question.id,)),
+                         {'choice': self.blue.pk})
+        response = self.client.get(
+            reverse('polls:results', args=(self.question.id,)))
+        self.assertContains(response, 'Blue -- 1 vote<')
+
+    def test_results_json(self):
+        response = self.client.get(
+            reverse('polls:results_json', args=(self.question.id,)))
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['total_votes'], 2)
+        self.assertEqual(data['question']['question_text'], 'Colour?')
+        self.assertEqual([(c['choice_text'], c['votes'])
+                          for c in data['choices']],
+                         [('Red', 2), ('Blue', 0)])
+
+    def test_missing_question(self):
+        response = self.client.get(reverse('polls:results', args=(999,)))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('polls:results_json',
+                                           args=(999,)))
+        self.assertEqual(response.status_code, 404)
+
+
+class IndexCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = create_question(question_text='Past question.',
+                                        days=-1)
+
+    def index(self):
+        response = self.client.get(reverse('polls:index'))
+        return [question.question_text
+                for question in response.context['latest_question_list']]
+
+    def test_cached(self):
+        self.assertEqual(self.index(), ['Past question.'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index(), ['Past question.'])
+
+    def test_save_and_delete_invalidate(self):
+        self.index()
+        self.question.question_text = 'Renamed.'
+        self.question.save()
+        self.assertEqual(self.index(), ['Renamed.'])
+        create_question(question_text='Newer question.', days=0)
+        self.assertEqual(self.index(), ['Newer question.', 'Renamed.'])
+        self.question.delete()
+        self.assertEqual(self.index(), ['Newer question.'])
+
+    def test_scheduled_question_appears_when_due(self):
+        """
+        The cached list expires when the next scheduled question is due,
+        without anything being saved.
+        """
+        Question.objects.create(
+            question_text='Scheduled question.',
+            pub_date=timezone.now() + datetime.timedelta(seconds=0.5))
+        self.assertEqual(self.index(), ['Past question.'])
+        self.assertEqual(cache.get(latest.CACHE_KEY)['questions'],
+                         [self.question])
+        time.sleep(0.6)
+        self.assertEqual(self.index(),
+                         ['Scheduled question.', 'Past question.'])
+
+    def test_pub_date_is_indexed(self):
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_indexes(
+                cursor, Question._meta.db_table)
+        self.assertIn('pub_date', indexes)
+
+
+class PageQueryTests(TestCase):
+    """
+    Each page runs a fixed number of queries, however many choices the
+    question has.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.question = create_question(question_text='Colour?', days=-1)
+        self.choices = [self.question.choice_set.create(choice_text=text)
+                        for text in ('Red', 'Green', 'Blue')]
+
+    def test_index(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('polls:index'))
+
+    def test_detail(self):
+        """
+        The question and its choices.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('polls:detail', args=(self.question.id,)))
+        for choice in self.choices:
+            self.assertContains(response, choice.choice_text)
+
+    def test_results(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('polls:results', args=(self.question.id,)))
+        self.assertContains(response, '0 votes in total.')
+
+    def test_results_without_choices(self):
+        question = create_question(question_text='Empty?', days=-1)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('polls:results_json', args=(question.id,)))
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['choices'], [])
+        self.assertEqual(data['question']['question_text'], 'Empty?')
+
+    def test_vote(self):
+        """
+        Checking the choice, counting the vote and rebuilding the results.
+        """
+        url = reverse('polls:vote', args=(self.question.id,))
+        with self.assertNumQueries(3):
+            response = self.client.post(url, {'choice': self.choices[1].pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Choice.objects.get(pk=self.choices[1].pk).votes, 1)
+
+    @override_settings(POLLS_BUFFER_VOTES=True)
+    def test_buffered_vote(self):
+        """
+        Buffered votes only check the choice; the results are rebuilt when
+        the buffer is written.
+        """
+        votes.buffer.flush()
+        url = reverse('polls:vote', args=(self.question.id,))
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'choice': self.choices[1].pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(cache.get(results.cache_key(self.question.id)))
+        votes.buffer.flush()
+        self.assertEqual(
+            results.get(self.question.id)['choices'][1]['votes'], 1)
+
+    def test_vote_for_another_questions_choice(self):
+        other = create_question(question_text='Size?', days=-1)
+        choice = other.choice_set.create(choice_text='Big')
+        url = reverse('polls:vote', args=(self.question.id,))
+        with self.assertNumQueries(3):
+            response = self.client.post(url, {'choice': choice.pk})
+        self.assertContains(response, "You didn&#39;t select a choice.")
+        self.assertEqual(Choice.objects.get(pk=choice.pk).votes, 0)
+
+    def test_vote_with_bad_choice(self):
+        url = reverse('polls:vote', args=(self.question.id,))
+        response = self.client.post(url, {'choice': 'red'})
+        self.assertContains(response, "You didn&#39;t select a choice.")
+
+    def test_vote_on_unpublished_question(self):
+        question = create_question(question_text='Later?', days=5)
+        choice = question.choice_set.create(choice_text='Yes')
+        response = self.client.post(
+            reverse('polls:vote', args=(question.id,)), {'choice': choice.pk})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Choice.objects.get(pk=choice.pk).votes, 0)
+
+
+@override_settings(TIMING_ENABLED=True)
+class TimingTests(TestCase):
+    def setUp(self):
+        timing.histograms.clear()
+        self.question = create_question(question_text='Colour?', days=-1)
+
+    def test_server_timing(self):
+        response = self.client.get(
+            reverse('polls:detail', args=(self.question.id,)))
+        header = response['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertIn('queries"', header)
+        self.assertIn('template;dur=', header)
+        self.assertIn('render;dur=', header)
+        self.assertIn('total;dur=', header)
+
+    @override_settings(INTERNAL_IPS=['127.0.0.1'])
+    def test_histograms(self):
+        for _ in range(3):
+            self.client.get(reverse('polls:index'))
+        response = self.client.get('/__timing__/')
+        data = json.loads(response.content.decode('utf-8'))
+        index = data['views']['polls:index']
+        self.assertEqual(index['total']['count'], 3)
+        # Only the first request reads the index from the database.
+        self.assertEqual(index['queries']['sum'], 2)
+        self.assertEqual(sum(index['queries']['buckets']), 3)
+        self.assertEqual(len(data['buckets']),
+                         len(index['total']['buckets']))
+
+    def test_histograms_are_private(self):
+        """
+        Without DEBUG, only internal IPs and staff can see the histograms.
+        """
+        self.assertEqual(self.client.get('/__timing__/').status_code, 404)
+        response = self.client.get('/__timing__/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+        with self.settings(INTERNAL_IPS=['10.0.0.1']):
+            response = self.client.get('/__timing__/',
+                                       REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'timing-%(pid)s.json')
+        with self.settings(TIMING_METRICS_FILE=path,
+                           TIMING_FLUSH_INTERVAL=0):
+            self.client.get(reverse('polls:index'))
+        with open(path % {'pid': os.getpid()}) as f:
+            data = json.load(f)
+        self.assertEqual(data['views']['polls:index']['total']['count'], 1)
+
+    @override_settings(TIMING_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('polls:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+QUERY_BUDGETS = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+
+def polls_urls():
+    """
+    The name and a URL of every pattern in polls.urls. Question ids are
+    those of the latest published question.
+    """
+    question = Question.objects.filter(
+        pub_date__lte=timezone.now()).order_by('-pub_date')[0]
+    urls = []
+    for pattern in urlpatterns:
+        kwargs = dict((group, question.pk)
+                      for group in pattern.regex.groupindex)
+        urls.append((pattern.name,
+                     reverse('polls:%s' % pattern.name, kwargs=kwargs)))
+    return urls
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every view in polls.urls has to run the same number of queries with
+    more questions and choices in the database, and no more than its budget
+    in query_budgets.json.
+    """
+
+    def seed(self, questions, choices_each):
+        for i in range(questions):
+            question = create_question(question_text='Question %d?' % i,
+                                       days=-1 - i)
+            for j in range(choices_each):
+                question.choice_set.create(choice_text='Choice %d' % j)
+
+    def measure(self):
+        counts = {}
+        for name, url in polls_urls():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[name] = len(context.captured_queries)
+        return counts
+
+    def test_query_budgets(self):
+        self.seed(questions=2, choices_each=2)
+        small = self.measure()
+        self.seed(questions=8, choices_each=5)
+        large = self.measure()
+        with open(QUERY_BUDGETS) as f:
+            budgets = json.load(f)
+
+        self.assertEqual(sorted(large), sorted(budgets),
+                         'Every view needs a budget in %s.' % QUERY_BUDGETS)
+        for name in sorted(large):
+            self.assertEqual(
+                large[name], small[name],
+                '%s ran %d queries with more rows, and %d with fewer.'
+                % (name, large[name], small[name]))
+            self.assertLessEqual(
+                large[name], budgets[name],
+                '%s ran %d queries, over its budget of %d.'
+                % (name, large[name], budgets[name]))
+
+
+class SharedModuleTests(SimpleTestCase):
+    """
+    `timing` and `benchmarking` are copied between this project and the
+    snippets one, and the copies must not drift apart.
+    """
+    other = os.path.join(settings.BASE_DIR, os.pardir, os.pardir, 'tutorial',
+                         'tutorial')
+
+    def test_copies_match(self):
+        if not os.path.isdir(self.other):
+            self.skipTest('The other project is not checked out.')
+        here = os.path.dirname(os.path.abspath(timing.__file__))
+        for name in ('timing.py', 'benchmarking.py'):
+            with open(os.path.join(here, name), 'rb') as f:
+                mine = f.read()
+            with open(os.path.join(self.other, name), 'rb') as f:
+                theirs = f.read()
+            self.assertEqual(mine, theirs,
+                             '%s differs from its copy in %s.'
+                             % (name, self.other))
@@ -7,5 +7,7 @@ urlpatterns = [
     url(r'^(?P<pk>[0-9]+)/$', views.DetailView.as_view(), name='detail'),
     url(r'^(?P<pk>[0-9]+)/results/$', views.ResultsView.as_view(),
         name='results'),
+    url(r'^(?P<pk>[0-9]+)/results\.json$', views.results_json,
+        name='results_json'),
     url(r'^(?P<question_id>[0-9]+)/vote/$', views.vote, name='vote'),
 ]
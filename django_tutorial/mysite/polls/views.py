@@ -1,11 +1,17 @@
 from django.shortcuts import get_object_or_404, render
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.core.urlresolvers import reverse
 from django.views import generic
 from .models import Choice, Question
+from . import latest, results, votes
 from django.utils import timezone
 
 
+def published_questions():
+    return Question.objects.filter(
+        pub_date__lte=timezone.now()).prefetch_related('choice_set')
+
+
 class IndexView(generic.ListView):
     template_name = 'polls/index.html'
     context_object_name = 'latest_question_list'
@@ -13,11 +19,9 @@ class IndexView(generic.ListView):
     def get_queryset(self):
         """
         Return the last five published questions (not including those set to be
-        published in the future).
+        published in the future), from the cache when it is current.
         """
-        return Question.objects.filter(
-            pub_date__lte=timezone.now()
-        ).order_by('-pub_date')[:5]
+        return latest.get()
 
 
 class DetailView(generic.DetailView):
@@ -26,30 +30,59 @@ class DetailView(generic.DetailView):
 
     def get_queryset(self):
         """
-        Excludes any questions that aren't published yet.
+        Excludes any questions that aren't published yet. The choices the
+        form lists are fetched along with the question.
         """
-        return Question.objects.filter(pub_date__lte=timezone.now())
+        return published_questions()
 
 
-class ResultsView(generic.DetailView):
-    model = Question
+class ResultsView(generic.TemplateView):
     template_name = 'polls/results.html'
 
+    def get_context_data(self, **kwargs):
+        """
+        Render from the cached results snapshot rather than the database.
+        """
+        context = super(ResultsView, self).get_context_data(**kwargs)
+        snapshot = results.get(self.kwargs['pk'])
+        if snapshot is None:
+            raise Http404("No question found.")
+        context['question'] = snapshot['question']
+        context['results'] = snapshot
+        return context
+
+
+def results_json(request, pk):
+    """
+    The results snapshot as JSON, for clients that poll for updates.
+    """
+    snapshot = results.get(pk)
+    if snapshot is None:
+        raise Http404("No question found.")
+    return JsonResponse(snapshot)
+
 
 def vote(request, question_id):
-    p = get_object_or_404(Question, pk=question_id)
+    # One query checks the choice belongs to this question, and that the
+    # question is published.
     try:
-        selected_choice = p.choice_set.get(pk=request.POST['choice'])
-    except (KeyError, Choice.DoesNotExist):
+        selected_choice = Choice.objects.get(
+            pk=request.POST['choice'], question_id=question_id,
+            question__pub_date__lte=timezone.now())
+    except (KeyError, ValueError, Choice.DoesNotExist):
         # Redisplay the question voting form.
+        p = get_object_or_404(published_questions(), pk=question_id)
         return render(request, 'polls/detail.html', {
             'question': p,
             'error_message': "You didn't select a choice.",
         })
     else:
-        selected_choice.votes += 1
-        selected_choice.save()
+        votes.record_vote(selected_choice.pk)
+        # Buffered votes refresh the results when they are written.
+        if not votes.buffered():
+            results.refresh(selected_choice.question_id)
         # Always return an HttpResponseRedirect after successfully dealing
         # with POST data. This prevents data from being posted twice if a
         # user hits the Back button.
-        return HttpResponseRedirect(reverse('polls:results', args=(p.id,)))
+        return HttpResponseRedirect(
+            reverse('polls:results', args=(selected_choice.question_id,)))
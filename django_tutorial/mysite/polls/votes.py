@@ -0,0 +1,154 @@
+import atexit
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from . import results
+from .models import Choice
+
+"""
+Votes are applied with a single `UPDATE ... SET votes = votes + 1`, so
+concurrent voters can't overwrite each other's increments.
+
+For very hot polls, `POLLS_BUFFER_VOTES = True` collects increments in
+memory instead, spread over several locked shards so voting threads rarely
+wait on each other, and writes them out in one transaction every
+`POLLS_VOTE_FLUSH_SIZE` votes, or `POLLS_VOTE_FLUSH_INTERVAL` seconds after
+the first vote since the last write, from a timer thread.
+Buffered votes that have not been flushed are lost if the process dies.
+"""
+
+
+class ShardedCounter(object):
+    """
+    Per-key counters split over `shards` independently locked dicts. Each
+    thread always uses the same shard, so even a single hot key is spread
+    across them.
+
+    Shards are handed out to threads in turn. Thread idents can't be used
+    for this: they are aligned addresses, so they mostly share a remainder.
+    """
+
+    def __init__(self, shards=16):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+
+    def shard(self):
+        """
+        The index of the calling thread's shard.
+        """
+        index = getattr(self._local, 'shard', None)
+        if index is None:
+            # `next` on a count is atomic under the GIL.
+            index = self._local.shard = (next(self._next_shard) %
+                                         len(self._shards))
+        return index
+
+    def add(self, key, amount=1):
+        counts, lock = self._shards[self.shard()]
+        with lock:
+            counts[key] = counts.get(key, 0) + amount
+
+    def drain(self):
+        """
+        Remove and return the totals accumulated so far.
+        """
+        totals = {}
+        for counts, lock in self._shards:
+            with lock:
+                items = list(counts.items())
+                counts.clear()
+            for key, amount in items:
+                totals[key] = totals.get(key, 0) + amount
+        return totals
+
+
+class VoteBuffer(object):
+    def __init__(self, flush_size=100, flush_interval=1.0, shards=16):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.counter = ShardedCounter(shards)
+        self._pending = 0
+        self._last_flush = time.time()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._timer_lock = threading.Lock()
+
+    def add(self, choice_id):
+        self.counter.add(choice_id)
+        # An unlocked counter is good enough to decide when to flush.
+        self._pending += 1
+        if (self._pending >= self.flush_size or
+                time.time() - self._last_flush >= self.flush_interval):
+            self.flush(wait=False)
+        elif self._timer is None:
+            self._schedule()
+
+    def _schedule(self):
+        """
+        Flush in `flush_interval` seconds, even if no more votes arrive.
+        """
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval,
+                                              self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self, wait=True):
+        """
+        Write buffered votes to the database. With `wait=False` this returns
+        straight away if another thread is already flushing.
+        """
+        if not self._flush_lock.acquire(wait):
+            return 0
+        try:
+            with self._timer_lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            self._pending = 0
+            self._last_flush = time.time()
+            totals = self.counter.drain()
+            if totals:
+                with transaction.atomic():
+                    for choice_id, amount in sorted(totals.items()):
+                        Choice.objects.filter(pk=choice_id).update(
+                            votes=F('votes') + amount)
+                for question_id in set(Choice.objects.filter(
+                        pk__in=list(totals)).values_list('question_id',
+                                                         flat=True)):
+                    results.refresh(question_id)
+            return sum(totals.values())
+        finally:
+            self._flush_lock.release()
+
+
+buffer = VoteBuffer(
+    flush_size=getattr(settings, 'POLLS_VOTE_FLUSH_SIZE', 100),
+    flush_interval=getattr(settings, 'POLLS_VOTE_FLUSH_INTERVAL', 1.0))
+atexit.register(buffer.flush)
+
+
+def buffered():
+    return getattr(settings, 'POLLS_BUFFER_VOTES', False)
+
+
+def record_vote(choice_id):
+    """
+    Count one vote for the choice with primary key `choice_id`.
+    """
+    if buffered():
+        buffer.add(choice_id)
+    else:
+        Choice.objects.filter(pk=choice_id).update(votes=F('votes') + 1)
@@ -0,0 +1,46 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import Client
+from django.utils import timezone
+from snippets.models import Snippet
+from tutorial.benchmarking import (benchmark_database, environment,  # noqa
+                                   percentile, query_stats, summary, timings)
+
+"""
+Helpers shared by the `bench_*` management commands, on top of the ones in
+`tutorial.benchmarking`.
+"""
+
+
+def json_client():
+    """
+    A test client that asks for JSON rather than the browsable API.
+    """
+    return Client(HTTP_ACCEPT='application/json')
+
+
+def create_users(count, prefix='bench'):
+    User.objects.bulk_create([User(username='%s%d' % (prefix, i))
+                              for i in range(count)])
+    return list(User.objects.filter(username__startswith=prefix))
+
+
+def create_snippets(count, owners, code='print("hello world")\n' * 5,
+                    batch_size=500):
+    """
+    Bulk insert `count` snippets spread across `owners`, one second apart.
+    They are not highlighted.
+    """
+    start = timezone.now() - datetime.timedelta(seconds=count)
+    Snippet.objects.bulk_create(
+        [Snippet(owner=owners[i % len(owners)], code=code,
+                 title='Snippet %d' % i) for i in range(count)],
+        batch_size=batch_size)
+    # `bulk_create` stamps every row with the same `created`.
+    with transaction.atomic():
+        for i, pk in enumerate(Snippet.objects.order_by('pk')
+                               .values_list('pk', flat=True)):
+            Snippet.objects.filter(pk=pk).update(
+                created=start + datetime.timedelta(seconds=i))
@@ -0,0 +1,248 @@
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F, Max
+from rest_framework import serializers, status
+from snippets import relations, render_cache, search
+from snippets.models import HighlightJob, Snippet
+
+"""
+Bulk writes for `SnippetViewSet.bulk`. Each item is validated on its own,
+so one bad item doesn't sink the batch. Everything valid is highlighted in
+one go, across a process pool for big batches, and written in a single
+transaction, with `bulk_create` for new snippets.
+"""
+
+# Forking a process pool costs more than it saves on small batches.
+PARALLEL_THRESHOLD = 50
+
+# Written by every bulk update, and by those that re-render the snippet.
+UPDATE_FIELDS = frozenset(['version', 'modified'])
+RENDER_FIELDS = frozenset(['highlight_key', 'highlighted', 'highlighted_gz',
+                           'highlight_pending'])
+
+
+def _detail_url(pk, request):
+    return relations.reverse('snippet-detail', kwargs={'pk': pk},
+                             request=request)
+
+
+def _error(code, errors):
+    return {'status': code, 'errors': errors}
+
+
+def _validate(serializer, item, instance=None, partial=False):
+    """
+    Validate one item with `serializer`, a `SnippetSerializer(many=True)`.
+    Returns `(validated_data, None)` or `(None, errors)`.
+    """
+    child = serializer.child
+    child.instance = instance
+    # Fields decide whether they are required from their root serializer,
+    # which is the list serializer, not the child.
+    serializer.partial = child.partial = partial
+    try:
+        return child.run_validation(item), None
+    except serializers.ValidationError as exc:
+        return None, exc.detail
+    finally:
+        child.instance = None
+        serializer.partial = child.partial = False
+
+
+def _highlight(snippets):
+    """
+    Fill in the highlighted HTML of `snippets`, or queue it when renders
+    are asynchronous. Returns the snippets whose render was queued.
+    """
+    inputs = [snippet.highlight_inputs() for snippet in snippets]
+    if getattr(settings, 'SNIPPETS_ASYNC_HIGHLIGHT', False):
+        results = [render_cache.lookup(render_cache.render_key(*args))
+                   for args in inputs]
+    else:
+        processes = 1 if len(inputs) < PARALLEL_THRESHOLD else None
+        results = render_cache.render_many(inputs, processes)
+    queued = []
+    for snippet, args, html in zip(snippets, inputs, results):
+        snippet.highlight_key = render_cache.render_key(*args)
+        snippet.store_render(html or '')
+        snippet.highlight_pending = html is None
+        if html is None:
+            queued.append(snippet)
+    return queued
+
+
+def _insert(snippets):
+    """
+    Insert `snippets` and set their primary keys.
+    """
+    if connection.vendor != 'sqlite':
+        for snippet in snippets:
+            models.Model.save(snippet)
+        return
+    Snippet.objects.bulk_create(snippets)
+    # SQLite holds its write lock until the transaction ends, so the rows
+    # just inserted have the highest, consecutive ids.
+    last = Snippet.objects.aggregate(last=Max('pk'))['last']
+    for offset, snippet in enumerate(reversed(snippets)):
+        snippet.pk = last - offset
+
+
+def create(items, serializer, request):
+    results, snippets = [], []
+    for item in items:
+        data, errors = _validate(serializer, item)
+        if errors is not None:
+            results.append(_error(status.HTTP_400_BAD_REQUEST, errors))
+            continue
+        snippet = Snippet(owner=request.user, **data)
+        snippets.append(snippet)
+        results.append(snippet)
+
+    queued = _highlight(snippets)
+    with transaction.atomic():
+        _insert(snippets)
+        search.index(snippets)
+        HighlightJob.objects.bulk_create(
+            [HighlightJob(snippet=snippet) for snippet in queued])
+
+    return [{'status': status.HTTP_201_CREATED,
+             'url': _detail_url(result.pk, request)}
+            if isinstance(result, Snippet) else result
+            for result in results]
+
+
+def _item_ids(items):
+    """
+    The primary key named by each item: either a bare id or an object with
+    an `id`. Items without one map to None.
+    """
+    ids = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get('id')
+        try:
+            ids.append(int(item))
+        except (TypeError, ValueError):
+            ids.append(None)
+    return ids
+
+
+def _check(items, ids, allowed):
+    """
+    Pair each item with the primary key it names, or with an error result
+    if it names none, one that is not in `allowed`, or one `allowed` maps to
+    False.
+    """
+    for item, pk in zip(items, ids):
+        if pk is None:
+            yield item, None, _error(status.HTTP_400_BAD_REQUEST,
+                                     {'id': ['This field is required.']})
+        elif pk not in allowed:
+            yield item, None, _error(status.HTTP_404_NOT_FOUND,
+                                     {'id': ['Not found.']})
+        elif not allowed[pk]:
+            yield item, None, _error(
+                status.HTTP_403_FORBIDDEN,
+                {'id': ['You do not have permission to change this '
+                        'snippet.']})
+        else:
+            yield item, pk, None
+
+
+def _lookup(items, view, queryset):
+    """
+    Pair each item with the snippet it names, checked against the view's
+    object permissions, or with an error result.
+    """
+    ids = _item_ids(items)
+    snippets = queryset.in_bulk([pk for pk in ids if pk is not None])
+    permissions = view.get_permissions()
+    allowed = dict(
+        (pk, all(permission.has_object_permission(view.request, view, snippet)
+                 for permission in permissions))
+        for pk, snippet in snippets.items())
+    for item, pk, error in _check(items, ids, allowed):
+        yield item, snippets.get(pk), error
+
+
+def _authorize(items, view, queryset):
+    """
+    Like `_lookup`, but pairs items with primary keys and never loads the
+    snippets: permissions with a `has_objects_permission` method check them
+    all with one query each. Permissions without one only guard single
+    objects.
+    """
+    ids = _item_ids(items)
+    wanted = [pk for pk in ids if pk is not None]
+    allowed = None
+    for permission in view.get_permissions():
+        check = getattr(permission, 'has_objects_permission', None)
+        if check is None:
+            continue
+        result = check(view.request, view, queryset, wanted)
+        if allowed is not None:
+            result = dict((pk, ok and allowed[pk])
+                          for pk, ok in result.items() if pk in allowed)
+        allowed = result
+    if allowed is None:
+        allowed = dict((pk, True) for pk in
+                       queryset.filter(pk__in=wanted)
+                       .values_list('pk', flat=True))
+    return _check(items, ids, allowed)
+
+
+def update(items, serializer, view, queryset, partial=False):
+    """
+    The snippets are locked while they are validated, rendered and written,
+    so that nothing else saves them in between. Each is written with only
+    the columns that changed, and a version bumped in the database.
+    """
+    request = view.request
+    results, changed = [], []
+    with transaction.atomic():
+        for item, snippet, error in _lookup(items, view,
+                                            queryset.select_for_update()):
+            if error is not None:
+                results.append(error)
+                continue
+            data, errors = _validate(serializer, item, snippet, partial)
+            if errors is not None:
+                results.append(_error(status.HTTP_400_BAD_REQUEST, errors))
+                continue
+            for name, value in data.items():
+                setattr(snippet, name, value)
+            changed.append((snippet, set(data) | UPDATE_FIELDS))
+            results.append(snippet)
+
+        stale = [snippet for snippet, fields in changed
+                 if render_cache.render_key(*snippet.highlight_inputs()) !=
+                 snippet.highlight_key]
+        queued = _highlight(stale)
+        for snippet, fields in changed:
+            if snippet in stale:
+                fields |= RENDER_FIELDS
+            version = snippet.version
+            snippet.version = F('version') + 1
+            models.Model.save(snippet, update_fields=fields)
+            # The row is locked, so this is what the database now holds.
+            snippet.version = version + 1
+        search.index([snippet for snippet, fields in changed])
+        HighlightJob.objects.bulk_create(
+            [HighlightJob(snippet=snippet) for snippet in queued])
+
+    return [{'status': status.HTTP_200_OK,
+             'url': _detail_url(result.pk, request)}
+            if isinstance(result, Snippet) else result
+            for result in results]
+
+
+def delete(items, view, queryset):
+    results, doomed = [], []
+    for item, pk, error in _authorize(items, view, queryset):
+        if error is not None:
+            results.append(error)
+            continue
+        doomed.append(pk)
+        results.append({'status': status.HTTP_204_NO_CONTENT, 'id': pk})
+    Snippet.objects.filter(pk__in=doomed).delete()
+    return results
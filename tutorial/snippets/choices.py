@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+
+import pygments
+from django.conf import settings
+
+"""
+Walking every Pygments lexer and style to build the `language` and `style`
+choices is slow enough to show up in the start-up time of every process, so
+the tables are built on first use instead of at import time, and are read
+from a JSON artifact generated for a particular Pygments version (see the
+`build_pygments_choices` command) rather than from Pygments itself.
+"""
+
+DEFAULT_ARTIFACT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'pygments_choices.json')
+
+_tables = None
+_lock = threading.Lock()
+
+
+def build():
+    """
+    Compute the choice tables from the installed Pygments.
+    """
+    from pygments.lexers import get_all_lexers
+    from pygments.styles import get_all_styles
+
+    lexers = [item for item in get_all_lexers() if item[1]]
+    return {
+        'pygments': pygments.__version__,
+        'languages': sorted([item[1][0], item[0]] for item in lexers),
+        'styles': sorted([item, item] for item in get_all_styles()),
+    }
+
+
+def artifact_path():
+    return getattr(settings, 'SNIPPETS_CHOICES_ARTIFACT', DEFAULT_ARTIFACT)
+
+
+def load():
+    """
+    Read the choice tables from the artifact, falling back to building them
+    when there is no artifact for the installed Pygments version.
+    """
+    path = artifact_path()
+    if path and os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('pygments') == pygments.__version__:
+            return data
+    return build()
+
+
+def tables():
+    global _tables
+    if _tables is None:
+        with _lock:
+            if _tables is None:
+                data = load()
+                _tables = dict((name, [tuple(pair) for pair in data[name]])
+                               for name in ('languages', 'styles'))
+    return _tables
+
+
+class LazyChoices(object):
+    """
+    A read-only sequence of `(value, label)` pairs that is only looked up
+    the first time it is iterated or indexed. It is always truthy, so
+    Django sets up `get_FOO_display` without forcing it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __iter__(self):
+        return iter(tables()[self.name])
+
+    def __len__(self):
+        return len(tables()[self.name])
+
+    def __getitem__(self, index):
+        return tables()[self.name][index]
+
+    def __contains__(self, item):
+        return tuple(item) in tables()[self.name]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __bool__(self):
+        return True
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '<LazyChoices: %s>' % self.name
+
+
+LANGUAGE_CHOICES = LazyChoices('languages')
+STYLE_CHOICES = LazyChoices('styles')
@@ -0,0 +1,140 @@
+from calendar import timegm
+
+from django.db import transaction
+from django.http import Http404, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import (http_date, parse_etags, parse_http_date_safe,
+                               quote_etag)
+from rest_framework import permissions, status
+from rest_framework.exceptions import APIException
+
+"""
+Conditional request support for detail routes. Validators come from a
+`version` counter, bumped on every write, and a `modified` timestamp, both
+read with a single narrow query so that a 304 costs neither loading the row
+nor serializing it.
+
+ETags are strong, so each representation of a version gets its own: the
+negotiated format and any `?fields=` are part of the tag. If-Match only
+cares about the version, so any representation's tag will do there.
+"""
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has changed since it was last fetched.'
+
+
+class Validators(object):
+    def __init__(self, pk, version, modified, variant=''):
+        self.version_tag = self.etag = '%s-%s' % (pk, version)
+        if variant:
+            self.etag = '%s-%s' % (self.etag, variant)
+        self.version = version
+        self.modified = modified
+
+    @property
+    def last_modified(self):
+        return timegm(self.modified.utctimetuple())
+
+    def not_modified(self, request):
+        """
+        Whether the client's cached copy is still current. If-None-Match
+        takes precedence over If-Modified-Since, as RFC 7232 requires.
+        """
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or self.etag in etags
+        since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'))
+        return since is not None and self.last_modified <= since
+
+    def matches(self, request):
+        """
+        Whether an If-Match header, if any, names the current version, in
+        whichever representation.
+        """
+        if_match = request.META.get('HTTP_IF_MATCH')
+        if if_match is None:
+            return True
+        prefix = self.version_tag + '-'
+        return any(etag in ('*', self.version_tag) or etag.startswith(prefix)
+                   for etag in parse_etags(if_match))
+
+    def apply(self, response):
+        response['ETag'] = quote_etag(self.etag)
+        response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+    def not_modified_response(self):
+        return self.apply(HttpResponseNotModified())
+
+
+class ConditionalMixin(object):
+    """
+    Adds ETag and Last-Modified to `retrieve`, answers If-None-Match and
+    If-Modified-Since with 304 Not Modified, and rejects updates whose
+    If-Match names an old version with 412 Precondition Failed.
+    """
+    version_field = 'version'
+    modified_field = 'modified'
+
+    def get_representation(self):
+        """
+        The ETag variant for the response being rendered: the negotiated
+        format, then the sorted `?fields=` on reads, like `json.code.title`.
+        """
+        request = self.request
+        variant = request.accepted_renderer.format
+        fields = getattr(self.get_serializer_class(), 'fields_query_param',
+                         None)
+        requested = fields and request.query_params.get(fields)
+        if requested and request.method in permissions.SAFE_METHODS:
+            names = set(name.strip() for name in requested.split(','))
+            variant = '.'.join([variant] + sorted(names))
+        return variant
+
+    def get_validators(self, variant='', for_update=False):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        if for_update:
+            queryset = queryset.select_for_update()
+        row = (queryset.filter(**{self.lookup_field:
+                                  self.kwargs[lookup_url_kwarg]})
+               .values_list('pk', self.version_field, self.modified_field)
+               .first())
+        if row is None:
+            raise Http404
+        return Validators(*row, variant=variant)
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_validators(self.get_representation())
+        if validators.not_modified(request):
+            response = validators.not_modified_response()
+        else:
+            response = super(ConditionalMixin, self).retrieve(
+                request, *args, **kwargs)
+            validators.apply(response)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            if 'HTTP_IF_MATCH' in request.META:
+                validators = self.get_validators(for_update=True)
+                if not validators.matches(request):
+                    raise PreconditionFailed()
+            response = super(ConditionalMixin, self).update(
+                request, *args, **kwargs)
+        instance = self.saved_instance
+        validators = Validators(instance.pk,
+                                getattr(instance, self.version_field),
+                                getattr(instance, self.modified_field),
+                                self.get_representation())
+        patch_vary_headers(response, ('Accept',))
+        return validators.apply(response)
+
+    def perform_update(self, serializer):
+        super(ConditionalMixin, self).perform_update(serializer)
+        self.saved_instance = serializer.instance
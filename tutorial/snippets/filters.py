@@ -0,0 +1,72 @@
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from snippets import search
+
+"""
+Filter backends for `SnippetViewSet`'s list.
+"""
+
+
+def _datetime(params, name):
+    value = parse_datetime(params[name])
+    if value is None:
+        raise ParseError('Invalid %s timestamp.' % name)
+    return value
+
+
+class SnippetFilter(BaseFilterBackend):
+    """
+    Narrow the list down with `?language=`, `?style=`, `?owner=<username>`,
+    `?created_after=` and `?created_before=`. Each of these, alone or with
+    the ordering, is served by one of the indexes in `Snippet.Meta`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if params.get('language'):
+            queryset = queryset.filter(language=params['language'])
+        if params.get('style'):
+            queryset = queryset.filter(style=params['style'])
+        if params.get('owner'):
+            queryset = queryset.filter(owner__username=params['owner'])
+        if params.get('created_after'):
+            queryset = queryset.filter(
+                created__gte=_datetime(params, 'created_after'))
+        if params.get('created_before'):
+            queryset = queryset.filter(
+                created__lt=_datetime(params, 'created_before'))
+        return queryset
+
+
+class SnippetOrderingFilter(OrderingFilter):
+    """
+    `?ordering=` by one of the view's `ordering_fields`, with the primary
+    key as a tie-breaker so that pages are stable. Without the parameter
+    the queryset keeps its own order, such as search rank; the view's
+    `ordering` is then only what cursor pagination falls back to.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super(SnippetOrderingFilter, self).get_ordering(
+            request, queryset, view)
+        if not ordering:
+            return ordering
+        last = ordering[-1]
+        return list(ordering) + ['-pk' if last.startswith('-') else 'pk']
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param not in request.query_params:
+            return queryset
+        return super(SnippetOrderingFilter, self).filter_queryset(
+            request, queryset, view)
+
+
+class SnippetSearchFilter(BaseFilterBackend):
+    """
+    Search titles, descriptions and code with `?q=`, best match first.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get('q', '')
+        return search.search(queryset, query)
@@ -0,0 +1,156 @@
+import gzip
+import re
+from io import BytesIO
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.utils.html import escape
+import pygments
+from pygments import highlight
+from pygments.formatters.html import (CSSFILE_TEMPLATE, DOC_FOOTER,
+                                      DOC_HEADER_EXTERNALCSS, HtmlFormatter)
+from pygments.lexers import get_lexer_by_name
+
+"""
+Rendering is kept as plain functions of the snippet's highlight inputs,
+rather than as a method on the model, so that the work can be shipped to a
+pool of worker processes without pickling model instances.
+"""
+
+
+def full_documents():
+    """
+    Whether snippets store complete HTML documents with the stylesheet
+    embedded (`SNIPPETS_HIGHLIGHT_STORAGE = 'full'`), or only the
+    highlighted fragment (`'fragment'`), with the page put together by
+    `page` when it is served.
+    """
+    return getattr(settings, 'SNIPPETS_HIGHLIGHT_STORAGE', 'full') == 'full'
+
+
+def compressed():
+    """
+    Whether snippets store the page the highlight view serves, gzipped
+    (`SNIPPETS_HIGHLIGHT_STORAGE = 'gzip'`). Renders are fragments in this
+    mode too; the page is put together once, when it is stored.
+    """
+    return getattr(settings, 'SNIPPETS_HIGHLIGHT_STORAGE', 'full') == 'gzip'
+
+
+def is_full_document(html):
+    return html.startswith('<!DOCTYPE')
+
+
+def render(code, language, style, linenos=False, title='', full=True):
+    """
+    Use the `pygments` library to create a highlighted HTML representation
+    of a piece of code.
+    """
+    lexer = get_lexer_by_name(language)
+    linenos = linenos and 'table' or False
+    options = title and {'title': title} or {}
+    formatter = HtmlFormatter(style=style, linenos=linenos,
+                              full=full, **options)
+    return highlight(code, lexer, formatter)
+
+
+_stylesheets = {}
+
+
+def stylesheet(style):
+    """
+    The CSS that `full=True` documents embed, shared by every fragment
+    highlighted in `style`.
+    """
+    css = _stylesheets.get(style)
+    if css is None:
+        styledefs = HtmlFormatter(style=style).get_style_defs('body')
+        css = _stylesheets[style] = CSSFILE_TEMPLATE % {
+            'styledefs': styledefs}
+    return css
+
+
+def stylesheet_url(style):
+    """
+    The stylesheet changes only with Pygments itself, so its version is part
+    of the URL and the response can be cached indefinitely.
+    """
+    return '%s?v=%s' % (reverse('snippet-style', args=(style,)),
+                        pygments.__version__)
+
+
+def page(fragment, style, title=''):
+    """
+    Wrap a highlighted fragment in the same document `full=True` produces,
+    linking to the style's stylesheet instead of embedding it.
+    """
+    header = DOC_HEADER_EXTERNALCSS % {'title': escape(title),
+                                       'cssfile': stylesheet_url(style),
+                                       'encoding': 'utf-8'}
+    return header + fragment + DOC_FOOTER
+
+
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def accepts_gzip(request):
+    return bool(_accepts_gzip.search(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+def compress(html):
+    buf = BytesIO()
+    # A fixed timestamp, so that the same page always compresses the same.
+    with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as f:
+        f.write(html.encode('utf-8'))
+    return buf.getvalue()
+
+
+def decompress(data):
+    with gzip.GzipFile(fileobj=BytesIO(bytes(data))) as f:
+        return f.read().decode('utf-8')
+
+
+def stored(html, style, title=''):
+    """
+    The `Snippet` column values that store a render: the render itself in
+    `highlighted`, or in gzip mode the compressed page in `highlighted_gz`.
+    """
+    if not html or not compressed():
+        return {'highlighted': html, 'highlighted_gz': None}
+    if not is_full_document(html):
+        html = page(html, style, title)
+    return {'highlighted': '', 'highlighted_gz': compress(html)}
+
+
+def render_plain(code, title=''):
+    """
+    Plain-text stand-in served while the highlighted version is pending.
+    """
+    return ('<!DOCTYPE html>\n<html>\n<head>\n<title>%s</title>\n</head>\n'
+            '<body>\n<pre>%s</pre>\n</body>\n</html>\n'
+            % (escape(title), escape(code)))
+
+
+def _render_args(args):
+    return render(*args)
+
+
+def render_many(items, processes=None, pool=None):
+    """
+    Render a sequence of tuples of `render` arguments, fanning the work out
+    across a process pool: `pool` if one is given, or a new one with
+    `processes` workers. Results are returned in the same order as `items`.
+    """
+    items = list(items)
+    if pool is not None:
+        return pool.map(_render_args, items)
+    if processes == 1 or len(items) < 2:
+        return [_render_args(item) for item in items]
+    pool = Pool(processes)
+    try:
+        return pool.map(_render_args, items)
+    finally:
+        pool.close()
+        pool.join()
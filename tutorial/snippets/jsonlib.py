@@ -0,0 +1,36 @@
+"""
+The JSON library behind the API's renderer and parsers: simplejson, with
+its C speedups, when it is installed, and the standard library otherwise.
+
+simplejson is used rather than one of the faster C-only libraries because
+it takes REST framework's encoder class and formats floats, escapes and
+separators exactly as the standard library does, so responses are the
+same bytes whichever library produced them.
+"""
+
+try:
+    import simplejson as json
+    # Encode the way the standard library does.
+    OPTIONS = {'use_decimal': False, 'namedtuple_as_object': False}
+except ImportError:
+    import json
+    OPTIONS = None
+
+NAME = json.__name__
+
+
+def dumps(obj, cls=None, **kwargs):
+    """
+    `json.dumps`. `cls` may be a standard library encoder class, such as
+    REST framework's; simplejson is given its `default` method instead.
+    """
+    if OPTIONS is None:
+        return json.dumps(obj, cls=cls, **kwargs)
+    kwargs.update(OPTIONS)
+    if cls is not None:
+        kwargs['default'] = cls().default
+    return json.dumps(obj, **kwargs)
+
+
+def loads(s):
+    return json.loads(s)
@@ -0,0 +1,60 @@
+import json
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from snippets import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Compare creating snippets with one POST each against a single '
+            'bulk POST, as JSON and as NDJSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500)
+        parser.add_argument('--lines', type=int, default=40,
+                            help='Lines of code in each snippet.')
+
+    def handle(self, *args, **options):
+        with benchmarks.benchmark_database():
+            User.objects.create_user('bench', password='bench')
+            client = benchmarks.json_client()
+            client.login(username='bench', password='bench')
+            results = dict(
+                (name, self.run(client, name, options['count'],
+                                options['lines']))
+                for name in ('single', 'bulk_json', 'bulk_ndjson'))
+        self.stdout.write(json.dumps(results, indent=2, sort_keys=True,
+                                     separators=(',', ': ')))
+
+    def items(self, count, lines):
+        # Unique code for every run, so no mode is helped by the render
+        # cache.
+        token = uuid.uuid4().hex
+        return [{'title': 'Snippet %d' % i,
+                 'code': ''.join('x_%s_%d = %d\n' % (token, i, line)
+                                 for line in range(lines))}
+                for i in range(count)]
+
+    def run(self, client, name, count, lines):
+        items = self.items(count, lines)
+        start = time.time()
+        if name == 'single':
+            for item in items:
+                response = client.post('/snippets/', json.dumps(item),
+                                       content_type='application/json')
+                assert response.status_code == 201, response.status_code
+        else:
+            if name == 'bulk_json':
+                body = json.dumps(items)
+                content_type = 'application/json'
+            else:
+                body = '\n'.join(json.dumps(item) for item in items)
+                content_type = 'application/x-ndjson'
+            response = client.post('/snippets/bulk/', body,
+                                   content_type=content_type)
+            assert response.status_code == 200, response.status_code
+        elapsed = time.time() - start
+        return {'seconds': round(elapsed, 3),
+                'snippets_per_second': round(count / elapsed, 1)}
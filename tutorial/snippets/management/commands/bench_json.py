@@ -0,0 +1,57 @@
+import json
+import time
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from snippets import jsonlib
+from snippets.models import Snippet
+from snippets.parsers import FastJSONParser
+from snippets.renderers import FastJSONRenderer
+from snippets.serializers import SnippetSerializer
+
+
+class Command(BaseCommand):
+    help = ('Compare encoding and decoding a list of snippets with the '
+            'stock JSON renderer and parser and the fast ones.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        owner = User(pk=1, username='bench')
+        code = u'def f(x):\n    return "<%s>" % x  # caf\xe9\n' * 10
+        snippets = [Snippet(pk=i + 1, owner=owner, code=code,
+                            title=u'Snippet %d' % i,
+                            description=u'Snippet number %d' % i)
+                    for i in range(options['rows'])]
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            request = Request(APIRequestFactory().get('/snippets/'))
+            data = SnippetSerializer(snippets, many=True,
+                                     context={'request': request}).data
+        body = JSONRenderer().render(data)
+
+        def best(func):
+            runs = []
+            for _ in range(options['runs']):
+                start = time.time()
+                func()
+                runs.append(time.time() - start)
+            return round(min(runs) * 1000, 1)
+
+        results = {'library': jsonlib.NAME, 'bytes': len(body)}
+        for name, renderer, parser in [
+                ('stock', JSONRenderer(), JSONParser()),
+                ('fast', FastJSONRenderer(), FastJSONParser())]:
+            results[name] = {
+                'encode_ms': best(lambda: renderer.render(data)),
+                'decode_ms': best(lambda: parser.parse(BytesIO(body))),
+            }
+        self.stdout.write(json.dumps(results, indent=2, sort_keys=True,
+                                     separators=(',', ': ')))
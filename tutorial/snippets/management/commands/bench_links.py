@@ -0,0 +1,55 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from snippets.models import Snippet
+from snippets.serializers import SnippetSerializer
+
+
+class StockSnippetSerializer(SnippetSerializer):
+    """
+    `SnippetSerializer` with REST framework's own hyperlinked fields.
+    """
+    serializer_url_field = serializers.HyperlinkedIdentityField
+    highlight = serializers.HyperlinkedIdentityField(
+        view_name='snippet-highlight', format='html')
+
+
+class Command(BaseCommand):
+    help = ('Compare the per-row cost of serializing snippets with cached '
+            'hyperlinks against reversing every link.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        owner = User(pk=1, username='bench')
+        snippets = [Snippet(pk=i + 1, owner=owner, code='pass',
+                            title='Snippet %d' % i)
+                    for i in range(options['rows'])]
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, serializer_class in [('reverse', StockSnippetSerializer),
+                                           ('cached', SnippetSerializer)]:
+                best = min(self.run(serializer_class, snippets)
+                           for _ in range(options['runs']))
+                results[name] = {
+                    'us_per_row': round(best / len(snippets) * 1e6, 2),
+                    'rows_per_second': int(len(snippets) / best),
+                }
+        self.stdout.write(json.dumps(results, indent=2, sort_keys=True,
+                                     separators=(',', ': ')))
+
+    def run(self, serializer_class, snippets):
+        # A fresh request each run, so the cached fields start cold.
+        request = Request(APIRequestFactory().get('/snippets/'))
+        start = time.time()
+        serializer_class(snippets, many=True,
+                         context={'request': request}).data
+        return time.time() - start
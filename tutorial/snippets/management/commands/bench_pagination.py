@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.pagination import Cursor
+from rest_framework.settings import api_settings
+from snippets import benchmarks
+from snippets.models import Snippet
+from snippets.pagination import SnippetCursorPagination
+
+
+class Command(BaseCommand):
+    help = ('Compare the latency of a deep page of /snippets/ with page '
+            'numbers, page numbers without a count, and cursors.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--page', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with benchmarks.benchmark_database():
+            owners = benchmarks.create_users(10)
+            benchmarks.create_snippets(options['rows'], owners)
+            results = self.run(options['page'], options['runs'])
+        self.stdout.write(json.dumps(results, indent=2, sort_keys=True,
+                                     separators=(',', ': ')))
+
+    def run(self, page, runs):
+        client = benchmarks.json_client()
+        offset = (page - 1) * api_settings.PAGE_SIZE
+        # The cursor a client would hold after paging through to `page`.
+        created = Snippet.objects.order_by('created', 'pk').values_list(
+            'created', flat=True)[offset - 1]
+        paginator = SnippetCursorPagination()
+        paginator.base_url = '/snippets/'
+        cursor_url = paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=str(created)))
+
+        def fetch(url):
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+        def measure(url):
+            result = benchmarks.summary(
+                benchmarks.timings(lambda: fetch(url), runs))
+            result.update(benchmarks.query_stats(lambda: fetch(url)))
+            return result
+
+        results = {}
+        with override_settings(SNIPPETS_PAGINATION='page'):
+            results['page'] = measure('/snippets/?page=%d' % page)
+            results['page_without_count'] = measure(
+                '/snippets/?page=%d&count=false' % page)
+        with override_settings(SNIPPETS_PAGINATION='cursor'):
+            results['cursor'] = measure(cursor_url)
+        return results
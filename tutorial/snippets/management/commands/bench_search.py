@@ -0,0 +1,72 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from snippets import benchmarks, search
+from snippets.models import Snippet
+
+WORDS = ('alpha', 'buffer', 'cache', 'decode', 'encode', 'fetch', 'graph',
+         'handle', 'index', 'json', 'kernel', 'lookup', 'merge', 'node',
+         'parse', 'queue', 'render', 'stream', 'token', 'update')
+
+
+class Command(BaseCommand):
+    help = ('Compare `?q=` searches served from the full-text index with '
+            "`LIKE '%...%'` scans, on a generated corpus.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        with benchmarks.benchmark_database():
+            owners = benchmarks.create_users(10)
+            start = time.time()
+            self.seed(options['rows'], owners, options['batch_size'])
+            seeded = time.time()
+            search.rebuild()
+            results = {'seed_seconds': round(seeded - start, 1),
+                       'index_seconds': round(time.time() - seeded, 1),
+                       'index_available': search.available()}
+            queries = {
+                'rare': 'ident_%d' % (options['rows'] // 2),
+                'common': 'render stream',
+                'missing': 'nonexistent',
+            }
+            for name, query in queries.items():
+                results[name] = self.run(query, options['runs'])
+        self.stdout.write(json.dumps(results, indent=2, sort_keys=True,
+                                     separators=(',', ': ')))
+
+    def seed(self, rows, owners, batch_size):
+        rng = random.Random(0)
+        for first in range(0, rows, batch_size):
+            batch = []
+            for i in range(first, min(first + batch_size, rows)):
+                a, b, c = [rng.choice(WORDS) for _ in range(3)]
+                batch.append(Snippet(
+                    owner=owners[i % len(owners)],
+                    title='%s %s' % (a.title(), b),
+                    code='def ident_%d(%s):\n    return %s_%s(%s)\n'
+                         % (i, a, b, c, a)))
+            with transaction.atomic():
+                Snippet.objects.bulk_create(batch)
+
+    def run(self, query, runs):
+        def indexed():
+            return list(search.search(Snippet.objects.all(), query)
+                        .values_list('pk', flat=True)[:10])
+
+        def scan():
+            return list(search.scan(Snippet.objects.all(), query)
+                        .values_list('pk', flat=True)[:10])
+
+        return {
+            'query': query,
+            'matches': search.search(Snippet.objects.all(), query).count(),
+            'index': benchmarks.summary(benchmarks.timings(indexed, runs)),
+            'like': benchmarks.summary(benchmarks.timings(scan, runs)),
+        }
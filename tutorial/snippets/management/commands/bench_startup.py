@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCRIPT = """
+import time
+start = time.time()
+import django
+from django.conf import settings
+if %(no_artifact)r:
+    settings.SNIPPETS_CHOICES_ARTIFACT = None
+django.setup()
+from snippets import choices
+if %(force)r:
+    list(choices.LANGUAGE_CHOICES), list(choices.STYLE_CHOICES)
+print(time.time() - start)
+"""
+
+MODES = (
+    # Tables built from Pygments as soon as the app loads, as they used to be.
+    ('pygments', {'no_artifact': True, 'force': True}),
+    # Tables read from the artifact on first use.
+    ('artifact', {'no_artifact': False, 'force': True}),
+    # Tables never needed, e.g. most management commands.
+    ('lazy', {'no_artifact': False, 'force': False}),
+)
+
+
+class Command(BaseCommand):
+    help = ('Time django.setup() in fresh interpreters with the snippet '
+            'choice tables built from Pygments, read from the artifact, or '
+            'never touched.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=10)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE=os.environ.get(
+                       'DJANGO_SETTINGS_MODULE', 'tutorial.settings'))
+        for name, params in MODES:
+            times = sorted(self.run(SCRIPT % params, env)
+                           for _ in range(options['runs']))
+            self.stdout.write('%-9s median %.1f ms  min %.1f ms' % (
+                name, times[len(times) // 2] * 1000, times[0] * 1000))
+
+    def run(self, script, env):
+        output = subprocess.check_output([sys.executable, '-c', script],
+                                         cwd=settings.BASE_DIR, env=env)
+        return float(output.decode().strip().splitlines()[-1])
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from snippets import benchmarks
+from snippets.mixins import (eager_load, load_only, values_plan,
+                             values_representation)
+from snippets.models import Snippet
+from snippets.serializers import SnippetSerializer
+
+
+class Command(BaseCommand):
+    help = ('Compare serializing snippets from model instances with building '
+            'the same output from `.values()` rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmarks.benchmark_database():
+            owners = benchmarks.create_users(10)
+            benchmarks.create_snippets(options['rows'], owners)
+            request = Request(APIRequestFactory().get('/snippets/'))
+            context = {'request': request, 'format': None}
+            serializer = SnippetSerializer(context=context)
+
+            def instances():
+                queryset = load_only(eager_load(Snippet.objects.all(),
+                                                serializer), serializer)
+                return SnippetSerializer(queryset, many=True,
+                                         context=context).data
+
+            def values():
+                plan = values_plan(Snippet, serializer)
+                rows = Snippet.objects.values(
+                    *set(column for _, column in plan))
+                return [values_representation(row, plan, context)
+                        for row in rows]
+
+            assert instances() == values()
+            results = {}
+            for name, func in [('instances', instances), ('values', values)]:
+                best = min(benchmarks.timings(func, options['runs']))
+                results[name] = {
+                    'ms': round(best * 1000, 1),
+                    'rows_per_second': int(options['rows'] / best),
+                }
+        self.stdout.write(json.dumps(results, indent=2, sort_keys=True,
+                                     separators=(',', ': ')))
@@ -0,0 +1,85 @@
+import itertools
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from snippets import benchmarks, render_cache
+from snippets.models import Snippet
+
+
+class Command(BaseCommand):
+    help = ('Measure the latency, throughput and query counts of the main '
+            'snippet API endpoints, with the database seeded at several '
+            'sizes. Prints JSON that can be compared between commits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000',
+                            help='Comma separated numbers of snippets.')
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--output',
+                            help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        results = {'environment': None, 'runs': options['runs'],
+                   'sizes': {}}
+        for size in sizes:
+            with benchmarks.benchmark_database():
+                results['environment'] = benchmarks.environment()
+                owners = benchmarks.create_users(options['users'])
+                benchmarks.create_snippets(size, owners)
+                # The shared render cache outlives the benchmark database,
+                # and would make later runs faster than the first.
+                with override_settings(SNIPPETS_RENDER_CACHE=None):
+                    results['sizes'][str(size)] = self.run(options['runs'])
+        output = json.dumps(results, indent=2, sort_keys=True,
+                            separators=(',', ': '))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def run(self, runs):
+        User.objects.create_user('bench-writer', password='bench')
+        client = benchmarks.json_client()
+        client.login(username='bench-writer', password='bench')
+        # The seeded snippets are not highlighted; this one is.
+        snippet = Snippet.objects.create(
+            owner=User.objects.get(username='bench-writer'),
+            code='def hello():\n    print("hello world")\n' * 10,
+            language='python', title='Benchmark')
+        detail = '/snippets/%d/' % snippet.pk
+        counter = itertools.count()
+
+        def get(url, **extra):
+            def fetch():
+                response = client.get(url, **extra)
+                assert response.status_code == 200, response.status_code
+            return fetch
+
+        def create():
+            # Different code every time, so that Pygments does the work
+            # rather than the render cache.
+            body = json.dumps({'code': 'x = %d\n' % next(counter),
+                               'language': 'python'})
+            response = client.post('/snippets/', body,
+                                   content_type='application/json')
+            assert response.status_code == 201, response.status_code
+
+        scenarios = [
+            ('list', get('/snippets/')),
+            ('retrieve', get(detail)),
+            ('create', create),
+            ('highlight', get(detail + 'highlight/', HTTP_ACCEPT='text/html',
+                              HTTP_ACCEPT_ENCODING='gzip')),
+        ]
+        results = {}
+        for name, func in scenarios:
+            render_cache.reset()
+            # Measuring the queries also warms up the endpoint.
+            result = benchmarks.query_stats(func)
+            result.update(benchmarks.summary(benchmarks.timings(func, runs)))
+            results[name] = result
+        return results
@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand
+from snippets import choices
+
+
+class Command(BaseCommand):
+    help = ('Regenerate the language and style choices artifact for the '
+            'installed version of Pygments.')
+
+    def handle(self, *args, **options):
+        data = choices.build()
+        path = choices.artifact_path() or choices.DEFAULT_ARTIFACT
+        with open(path, 'w') as f:
+            f.write('{"pygments": %s,\n' % json.dumps(data['pygments']))
+            for i, name in enumerate(('languages', 'styles')):
+                rows = ',\n'.join('  ' + json.dumps(pair)
+                                  for pair in data[name])
+                f.write(' "%s": [\n%s\n ]%s\n'
+                        % (name, rows, ',' if i == 0 else '}'))
+        self.stdout.write('Wrote %d languages and %d styles for Pygments %s '
+                          'to %s.' % (len(data['languages']),
+                                      len(data['styles']),
+                                      data['pygments'], path))
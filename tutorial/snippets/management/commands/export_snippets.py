@@ -0,0 +1,36 @@
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from snippets import export
+
+
+class Command(BaseCommand):
+    help = 'Stream every snippet out as NDJSON or a JSON array.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since',
+                            help='Only snippets modified at or after this '
+                                 'ISO 8601 timestamp.')
+        parser.add_argument('--format', choices=('ndjson', 'json'),
+                            default='ndjson')
+        parser.add_argument('--output', '-o',
+                            help='File to write to (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('Invalid --since timestamp.')
+        rows = export.rows(since, options['chunk_size'])
+        lines = (export.json_array(rows) if options['format'] == 'json'
+                 else export.ndjson(rows))
+        if options['output']:
+            with io.open(options['output'], 'w', encoding='utf-8') as f:
+                for line in lines:
+                    f.write(line)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from snippets.tasks import process_highlight_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render snippets queued by SNIPPETS_ASYNC_HIGHLIGHT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Worker processes (default: one per CPU).')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the queue instead of '
+                                 'exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = process_highlight_jobs(options['batch_size'],
+                                           options['processes'])
+            total += count
+            if count:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write('Rendered %d snippet(s).' % total)
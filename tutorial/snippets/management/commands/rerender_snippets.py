@@ -0,0 +1,125 @@
+import json
+import operator
+import os
+import time
+from functools import reduce
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import (BinaryField, Case, F, Q, TextField, Value,
+                              When)
+from django.utils import timezone
+from snippets import highlighting, render_cache
+from snippets.models import Snippet
+
+FIELDS = ('pk', 'version', 'highlight_key', 'code', 'language', 'style',
+          'linenos', 'title')
+
+
+class Command(BaseCommand):
+    help = ('Re-render the highlighted HTML of stored snippets, e.g. after '
+            'upgrading Pygments or changing a style.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--language', action='append', default=[],
+                            help='Only snippets in this language '
+                                 '(repeatable).')
+        parser.add_argument('--style', action='append', default=[],
+                            help='Only snippets in this style (repeatable).')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render even snippets whose render is '
+                                 'already current.')
+        parser.add_argument('--chunk-size', type=int, default=100)
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Worker processes (default: one per CPU).')
+        parser.add_argument('--state-file', default='.rerender_snippets.json',
+                            help='Where progress is recorded so that an '
+                                 'interrupted run can be resumed.')
+        parser.add_argument('--resume', action='store_true',
+                            help='Carry on from the last recorded chunk.')
+
+    def handle(self, *args, **options):
+        state_file = options['state_file']
+        last_pk = 0
+        if options['resume']:
+            if not os.path.exists(state_file):
+                raise CommandError('No state file at %s.' % state_file)
+            with open(state_file) as f:
+                last_pk = json.load(f)['last_pk']
+
+        queryset = Snippet.objects.order_by('pk')
+        if options['language']:
+            queryset = queryset.filter(language__in=options['language'])
+        if options['style']:
+            queryset = queryset.filter(style__in=options['style'])
+        full = highlighting.full_documents()
+
+        scanned = rendered = 0
+        start = time.time()
+        pool = Pool(options['processes'])
+        try:
+            while True:
+                rows = list(queryset.filter(pk__gt=last_pk)
+                            .values_list(*FIELDS)[:options['chunk_size']])
+                if not rows:
+                    break
+                scanned += len(rows)
+                rendered += self.rerender(rows, full, options['force'], pool)
+                last_pk = rows[-1][0]
+                self.save_state(state_file, last_pk)
+                if options['verbosity'] >= 2:
+                    self.stdout.write('  up to #%d: %d scanned, %d rendered'
+                                      % (last_pk, scanned, rendered))
+        finally:
+            pool.close()
+            pool.join()
+
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        elapsed = time.time() - start
+        self.stdout.write(
+            'Scanned %d snippet(s) and re-rendered %d in %.1fs '
+            '(%.1f snippets/s).' % (scanned, rendered, elapsed,
+                                    rendered / elapsed if elapsed else 0))
+
+    def rerender(self, rows, full, force, pool):
+        """
+        Render the stale rows of a chunk and write them back with a single
+        UPDATE. Rows saved since they were read keep their newer render.
+        """
+        stale = []
+        for row in rows:
+            args = tuple(row[3:]) + (full,)
+            key = render_cache.render_key(*args)
+            if force or key != row[2]:
+                stale.append((row[0], row[1], key, args))
+        if not stale:
+            return 0
+        results = highlighting.render_many([args for _, _, _, args in stale],
+                                           pool=pool)
+        columns = [highlighting.stored(html, args[2], args[4])
+                   for (_, _, _, args), html in zip(stale, results)]
+        html = Case(*[When(pk=pk, then=Value(stored['highlighted']))
+                      for (pk, _, _, _), stored in zip(stale, columns)],
+                    output_field=TextField())
+        gz = Case(*[When(pk=pk, then=Value(stored['highlighted_gz'],
+                                           output_field=BinaryField()))
+                    for (pk, _, _, _), stored in zip(stale, columns)],
+                  output_field=BinaryField())
+        key = Case(*[When(pk=pk, then=Value(key))
+                     for pk, _, key, _ in stale],
+                   output_field=TextField())
+        unchanged = reduce(operator.or_, [Q(pk=pk, version=version)
+                                          for pk, version, _, _ in stale])
+        with transaction.atomic():
+            return Snippet.objects.filter(unchanged).update(
+                highlighted=html, highlighted_gz=gz, highlight_key=key,
+                highlight_pending=False,
+                version=F('version') + 1, modified=timezone.now())
+
+    def save_state(self, path, last_pk):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'last_pk': last_pk}, f)
+        os.rename(tmp, path)
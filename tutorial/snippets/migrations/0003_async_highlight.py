@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0002_snippet_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='snippet',
+            name='highlight_pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='HighlightJob',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('snippet', models.ForeignKey(related_name='highlight_jobs', to='snippets.Snippet')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import sys
+
+from django.db import migrations
+
+
+def convert(apps, full):
+    """
+    Re-render every stored document in the configured storage format and
+    report how much the `highlighted` column changed by.
+    """
+    from snippets import highlighting, render_cache
+
+    if highlighting.full_documents() != full:
+        return
+    Snippet = apps.get_model('snippets', 'Snippet')
+    before = after = count = 0
+    for snippet in Snippet.objects.exclude(highlighted='').iterator():
+        if highlighting.is_full_document(snippet.highlighted) == full:
+            continue
+        args = (snippet.code, snippet.language, snippet.style,
+                snippet.linenos, snippet.title, full)
+        html = highlighting.render(*args)
+        before += len(snippet.highlighted.encode('utf-8'))
+        after += len(html.encode('utf-8'))
+        count += 1
+        Snippet.objects.filter(pk=snippet.pk).update(
+            highlighted=html, highlight_key=render_cache.render_key(*args))
+    if count:
+        sys.stdout.write(
+            '\n  Converted %d snippet(s): highlighted went from %d to %d '
+            'bytes (%+.1f%%).' % (count, before, after,
+                                  100.0 * (after - before) / before))
+
+
+def to_fragments(apps, schema_editor):
+    convert(apps, full=False)
+
+
+def to_documents(apps, schema_editor):
+    convert(apps, full=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0004_snippet_highlight_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_fragments, to_documents),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0005_highlight_fragments'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='snippet',
+            index_together=set([('created', 'id')]),
+        ),
+    ]
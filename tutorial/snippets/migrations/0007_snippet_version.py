@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0006_snippet_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='snippet',
+            name='modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, auto_now=True),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='snippet',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
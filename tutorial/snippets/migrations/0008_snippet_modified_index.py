@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0007_snippet_version'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='snippet',
+            index_together=set([('created', 'id'), ('modified', 'id')]),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+TABLE = 'snippets_snippet_fts'
+
+
+def create_index(apps, schema_editor):
+    """
+    Create and fill the FTS5 search table on SQLite builds that have it. The
+    trigram tokenizer needs SQLite 3.34; older versions get word tokens.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    cursor = schema_editor.connection.cursor()
+    for tokenize in (", tokenize='trigram'", ''):
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE %s USING fts5('
+                           'title, description, code%s)' % (TABLE, tokenize))
+            break
+        except OperationalError:
+            continue
+    else:
+        return
+    cursor.execute('INSERT INTO %s (rowid, title, description, code) '
+                   'SELECT id, title, description, code '
+                   'FROM snippets_snippet' % TABLE)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.connection.cursor().execute(
+            'DROP TABLE IF EXISTS %s' % TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0008_snippet_modified_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0009_snippet_search'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='snippet',
+            index_together=set([('created', 'id'), ('modified', 'id'),
+                                ('owner', 'created', 'id'),
+                                ('language', 'created', 'id'),
+                                ('style', 'created', 'id')]),
+        ),
+    ]
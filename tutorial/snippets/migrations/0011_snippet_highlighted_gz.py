@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import sys
+
+from django.db import migrations, models
+
+
+def compress(apps, schema_editor):
+    """
+    In gzip mode, move every stored render into `highlighted_gz` as the
+    compressed page, and report how much smaller the renders became.
+    """
+    from snippets import highlighting
+
+    if not highlighting.compressed():
+        return
+    Snippet = apps.get_model('snippets', 'Snippet')
+    before = after = count = 0
+    for snippet in Snippet.objects.exclude(highlighted='').iterator():
+        stored = highlighting.stored(snippet.highlighted, snippet.style,
+                                     snippet.title)
+        before += len(snippet.highlighted.encode('utf-8'))
+        after += len(stored['highlighted_gz'])
+        count += 1
+        Snippet.objects.filter(pk=snippet.pk).update(**stored)
+    if count:
+        sys.stdout.write(
+            '\n  Compressed %d snippet(s): stored renders went from %d to %d '
+            'bytes (%+.1f%%). Run VACUUM to return the space to the '
+            'filesystem.' % (count, before, after,
+                             100.0 * (after - before) / before))
+
+
+def decompress(apps, schema_editor):
+    """
+    Put compressed pages back in `highlighted`, as complete documents.
+    """
+    from snippets import highlighting
+
+    Snippet = apps.get_model('snippets', 'Snippet')
+    for snippet in Snippet.objects.exclude(highlighted_gz=None).iterator():
+        Snippet.objects.filter(pk=snippet.pk).update(
+            highlighted=highlighting.decompress(snippet.highlighted_gz),
+            highlighted_gz=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0010_snippet_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='snippet',
+            name='highlighted_gz',
+            field=models.BinaryField(null=True, editable=False),
+        ),
+        migrations.RunPython(compress, decompress),
+    ]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+TABLE = 'snippets_snippet_fts'
+TRIGGER = 'snippets_snippet_fts_delete'
+
+
+def create_trigger(apps, schema_editor):
+    """
+    Drop snippets from the search table whenever they are deleted, so that
+    queryset and cascading deletes, which don't call `Snippet.delete`, keep
+    it current too.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.cursor()
+    if TABLE not in connection.introspection.table_names(cursor):
+        return
+    cursor.execute('CREATE TRIGGER %s AFTER DELETE ON snippets_snippet '
+                   'BEGIN DELETE FROM %s WHERE rowid = old.id; END'
+                   % (TRIGGER, TABLE))
+    # Rows deleted behind the index's back before now.
+    cursor.execute('DELETE FROM %s WHERE rowid NOT IN '
+                   '(SELECT id FROM snippets_snippet)' % TABLE)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.connection.cursor().execute(
+            'DROP TRIGGER IF EXISTS %s' % TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snippets', '0011_snippet_highlighted_gz'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
@@ -0,0 +1,276 @@
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.http import Http404
+from django.utils import six
+from rest_framework import relations, serializers
+from rest_framework.response import Response
+
+"""
+Serializers that follow relations issue a query per row unless the queryset
+they are given already joins or prefetches those relations. Rather than
+keeping a hand-written `select_related`/`prefetch_related` in sync with each
+serializer, `eager_load` reads the relations off the serializer's declared
+fields. `load_only` does the same for the columns a serializer reads, so
+that large columns it never outputs are not loaded either.
+
+For read-only requests `ValuesMixin` goes one step further: when every
+field can be read straight off a column, it builds the output from
+`.values()` rows without creating model instances or running the generic
+field machinery.
+"""
+
+
+def _relation_path(model, attrs):
+    """
+    Follow `attrs` through `model` for as long as they name relations.
+    Returns the relation fields traversed, in order.
+    """
+    path = []
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path.append(field)
+        model = field.related_model
+    return path
+
+
+def _only_keys(field):
+    """
+    A queryset for the far side of a to-many relation that loads just
+    enough to build links or primary keys to each object.
+    """
+    model = field.related_model
+    columns = [model._meta.pk.name]
+    if field.one_to_many:
+        columns.append(field.field.name)
+    return model._default_manager.only(*columns)
+
+
+def eager_load(queryset, serializer):
+    """
+    Add the `select_related` and `prefetch_related` calls `serializer` needs
+    to render rows of `queryset` in a constant number of queries.
+    """
+    model = queryset.model
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.source == '*':
+            continue
+        attrs = field.source_attrs
+        path = _relation_path(model, attrs)
+        if not path:
+            continue
+        names = [f.name for f in path]
+        is_many = isinstance(field, (relations.ManyRelatedField,
+                                     serializers.ListSerializer))
+        if any(f.many_to_many or f.one_to_many for f in path):
+            if is_many and len(path) == 1 and len(attrs) == 1:
+                prefetch.append(Prefetch(names[0],
+                                         queryset=_only_keys(path[0])))
+            else:
+                prefetch.append('__'.join(names))
+        elif len(path) < len(attrs) or isinstance(field,
+                                                  serializers.BaseSerializer):
+            # A value read off the related object, e.g. `owner.username`.
+            select.append('__'.join(names))
+        # A plain related field only needs the foreign key column.
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def load_only(queryset, serializer, extra=()):
+    """
+    Restrict `queryset` to the columns `serializer` reads, plus the `extra`
+    field names given. If any field reads something other than a model field
+    or a relation, the queryset is returned unchanged, since there is no
+    telling what that needs.
+    """
+    model = queryset.model
+    columns = [model._meta.pk.name] + list(extra)
+    for field in serializer.fields.values():
+        if field.source == '*':
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            return queryset
+        attrs = field.source_attrs
+        path = _relation_path(model, attrs)
+        if path and (path[0].many_to_many or path[0].one_to_many):
+            # Prefetched separately; only our primary key is needed.
+            continue
+        if len(path) == len(attrs):
+            last = path[-1]
+        elif len(path) == len(attrs) - 1:
+            owner = path[-1].related_model if path else model
+            try:
+                last = owner._meta.get_field(attrs[-1])
+            except FieldDoesNotExist:
+                return queryset
+        else:
+            return queryset
+        if not last.concrete:
+            return queryset
+        columns.append('__'.join(attrs))
+    return queryset.only(*columns)
+
+
+class EagerLoadingMixin(object):
+    """
+    Eager-load whatever the view's serializer reads from related objects.
+    """
+
+    def get_queryset(self):
+        queryset = super(EagerLoadingMixin, self).get_queryset()
+        return eager_load(queryset, self.get_serializer())
+
+
+def _ordering_fields(view):
+    """
+    Names of the fields the view's paginator may order by, and so read off
+    the rows to build its links; with cursor pagination that may be any of
+    the view's `ordering_fields`.
+    """
+    ordering = getattr(view.paginator, 'ordering', None) or ()
+    if isinstance(ordering, six.string_types):
+        ordering = (ordering,)
+    ordering = tuple(ordering) + tuple(getattr(view, 'ordering_fields',
+                                               None) or ())
+    return [name.lstrip('-') for name in ordering
+            if name.lstrip('-') != 'pk']
+
+
+class ListColumnsMixin(object):
+    """
+    On list actions, load only the columns the view's serializer reads, and
+    any the paginator reads off the rows to build its links.
+    """
+
+    def get_queryset(self):
+        queryset = super(ListColumnsMixin, self).get_queryset()
+        if self.action != 'list':
+            return queryset
+        return load_only(queryset, self.get_serializer(),
+                         _ordering_fields(self))
+
+
+def values_plan(model, serializer):
+    """
+    How to build `serializer`'s output from `.values()` rows of `model`: a
+    list of `(field, column)` pairs, or None if some field needs a model
+    instance. Hyperlinks to the row itself are built from its primary key;
+    other fields must read a concrete column, directly or through to-one
+    relations.
+    """
+    plan = []
+    for field in serializer._readable_fields:
+        if isinstance(field, relations.HyperlinkedIdentityField):
+            if field.lookup_field != 'pk':
+                return None
+            plan.append((field, 'pk'))
+            continue
+        if (field.source == '*' or
+                isinstance(field, (relations.RelatedField,
+                                   relations.ManyRelatedField,
+                                   serializers.BaseSerializer))):
+            return None
+        attrs = field.source_attrs
+        path = _relation_path(model, attrs)
+        if len(path) != len(attrs) - 1 or any(f.many_to_many or f.one_to_many
+                                              for f in path):
+            return None
+        owner = path[-1].related_model if path else model
+        try:
+            last = owner._meta.get_field(attrs[-1])
+        except FieldDoesNotExist:
+            return None
+        if not last.concrete or last.is_relation:
+            return None
+        plan.append((field, '__'.join(attrs)))
+    return plan
+
+
+def values_representation(row, plan, context):
+    """
+    The same `OrderedDict` the serializer's `to_representation` would give
+    for the instance `row` was read from.
+    """
+    request = context.get('request')
+    format = context.get('format')
+    ret = OrderedDict()
+    for field, column in plan:
+        value = row[column]
+        if value is None:
+            ret[field.field_name] = None
+        elif column == 'pk':
+            link_format = format
+            if format and field.format and field.format != format:
+                link_format = field.format
+            ret[field.field_name] = field.reverse(
+                field.view_name, kwargs={field.lookup_url_kwarg: value},
+                request=request, format=link_format)
+        else:
+            ret[field.field_name] = field.to_representation(value)
+    return ret
+
+
+class ValuesMixin(object):
+    """
+    Serve `list` and `retrieve` from `.values()` rows when `values_plan`
+    can build the serializer's output from columns alone.
+    """
+    values_fast_path = True
+
+    def get_values_plan(self, serializer):
+        if not self.values_fast_path:
+            return None
+        return values_plan(self.get_queryset().model, serializer)
+
+    def values_queryset(self, plan, extra=()):
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = set(column for _, column in plan)
+        columns.update(extra)
+        # Extra selects, such as a search rank, may be ordered by.
+        columns.update(queryset.query.extra)
+        return queryset.prefetch_related(None).values(*columns)
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        plan = self.get_values_plan(serializer)
+        if plan is None:
+            return super(ValuesMixin, self).list(request, *args, **kwargs)
+        queryset = self.values_queryset(plan, _ordering_fields(self))
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        data = [values_representation(row, plan, serializer.context)
+                for row in rows]
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        model = self.get_queryset().model
+        plan = self.get_values_plan(serializer)
+        if plan is None:
+            return super(ValuesMixin, self).retrieve(request, *args, **kwargs)
+        # Object permissions are checked against an instance holding the
+        # primary and foreign keys, which is what ownership checks read.
+        fields = [field for field in model._meta.concrete_fields
+                  if field.primary_key or field.many_to_one]
+        queryset = self.values_queryset(plan, [f.name for f in fields])
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = queryset.filter(**{self.lookup_field:
+                                 self.kwargs[lookup_url_kwarg]}).first()
+        if row is None:
+            raise Http404
+        self.check_object_permissions(request, model(**dict(
+            (field.attname, row[field.name]) for field in fields)))
+        return Response(values_representation(row, plan, serializer.context))
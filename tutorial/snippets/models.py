@@ -1,18 +1,14 @@
-from django.db import models
-from pygments.lexers import get_all_lexers
-from pygments.styles import get_all_styles
-from pygments.lexers import get_lexer_by_name
-from pygments.formatters.html import HtmlFormatter
-from pygments import highlight
+from django.conf import settings
+from django.db import models, transaction
+from snippets import highlighting, render_cache, search
+from snippets.choices import LANGUAGE_CHOICES, STYLE_CHOICES
 import write_to_db
 
-LEXERS = [item for item in get_all_lexers() if item[1]]
-LANGUAGE_CHOICES = sorted([(item[1][0], item[0]) for item in LEXERS])
-STYLE_CHOICES = sorted((item, item) for item in get_all_styles())
-
 
 class Snippet(models.Model):
     created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
     title = models.CharField(max_length=100, blank=True, default='')
     code = models.TextField()
     description = models.TextField(default=write_to_db.default_description())
@@ -23,19 +19,94 @@ class Snippet(models.Model):
         choices=STYLE_CHOICES, default='friendly', max_length=100)
     owner = models.ForeignKey('auth.User', related_name='snippets')
     highlighted = models.TextField()
+    highlighted_gz = models.BinaryField(null=True, editable=False)
+    highlight_pending = models.BooleanField(default=False)
+    highlight_key = models.CharField(max_length=40, blank=True, default='')
 
     class Meta:
         ordering = ('created',)
+        index_together = [('created', 'id'), ('modified', 'id'),
+                          ('owner', 'created', 'id'),
+                          ('language', 'created', 'id'),
+                          ('style', 'created', 'id')]
 
     def save(self, *args, **kwargs):
         """
         Use the `pygments` library to create a highlighted HTML
         representation of the code snippet.
+
+        Every save bumps `version`, which the views use for ETags.
+
+        Renders are cached by `render_cache.render_key`, and a save that
+        leaves the highlight inputs alone does not render at all.
+
+        With `SNIPPETS_ASYNC_HIGHLIGHT` turned on, a render that is not
+        already cached is queued as a `HighlightJob` instead, and the raw
+        code is saved straight away; the `process_highlight_jobs` command
+        renders it later.
+
+        With `SNIPPETS_HIGHLIGHT_STORAGE = 'gzip'` the page is stored
+        compressed in `highlighted_gz` rather than in `highlighted`.
+
+        The snippet's text is also (re)indexed for search.
+        """
+        if self.pk is not None:
+            self.version += 1
+        key = render_cache.render_key(*self.highlight_inputs())
+        queue = False
+        if key != self.highlight_key or not (self.highlighted or
+                                             self.highlighted_gz or
+                                             self.highlight_pending):
+            self.highlight_key = key
+            if getattr(settings, 'SNIPPETS_ASYNC_HIGHLIGHT', False):
+                html = render_cache.lookup(key)
+            else:
+                html = render_cache.render(*self.highlight_inputs())
+            queue = html is None
+            self.store_render(html or '')
+            self.highlight_pending = queue
+
+        with transaction.atomic():
+            super(Snippet, self).save(*args, **kwargs)
+            search.index([self])
+            if queue:
+                HighlightJob.objects.create(snippet=self)
+
+    def highlight_inputs(self):
+        """
+        The arguments `highlighting.render` needs for this snippet.
+        """
+        return (self.code, self.language, self.style, self.linenos,
+                self.title, highlighting.full_documents())
+
+    def store_render(self, html):
+        """
+        Set the columns holding the render, see `highlighting.stored`.
+        """
+        for name, value in highlighting.stored(html, self.style,
+                                               self.title).items():
+            setattr(self, name, value)
+
+    def highlighted_page(self):
+        """
+        The HTML document served by the highlight view.
         """
-        lexer = get_lexer_by_name(self.language)
-        linenos = self.linenos and 'table' or False
-        options = self.title and {'title': self.title} or {}
-        formatter = HtmlFormatter(style=self.style, linenos=linenos,
-                                  full=True, **options)
-        self.highlighted = highlight(self.code, lexer, formatter)
-        super(Snippet, self).save(*args, **kwargs)
+        if self.highlighted_gz:
+            return highlighting.decompress(self.highlighted_gz)
+        if highlighting.is_full_document(self.highlighted):
+            return self.highlighted
+        return highlighting.page(self.highlighted, self.style, self.title)
+
+
+class HighlightJob(models.Model):
+    """
+    A snippet waiting to have its `highlighted` HTML rendered.
+
+    A new job is queued on every save, so a worker that finds newer jobs for
+    the same snippet than the one it rendered leaves the result for them.
+    """
+    snippet = models.ForeignKey(Snippet, related_name='highlight_jobs')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('id',)
@@ -0,0 +1,19 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+"""
+Content negotiation for routes that name their output in a query parameter
+of their own, rather than in `?format=`.
+"""
+
+
+class OutputContentNegotiation(DefaultContentNegotiation):
+    """
+    Treats `?output=<format>` like a format suffix: only renderers of that
+    format are considered, and any other format is a 404.
+    """
+    output_query_param = 'output'
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        output = request.query_params.get(self.output_query_param)
+        return super(OutputContentNegotiation, self).select_renderer(
+            request, renderers, format_suffix or output)
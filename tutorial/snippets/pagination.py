@@ -0,0 +1,126 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.utils import six
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+"""
+Page numbers need an `OFFSET` scan to reach deep pages and a `COUNT(*)` of
+the whole table on every request. Setting `SNIPPETS_PAGINATION = 'cursor'`
+switches the list endpoints to keyset pagination instead, which seeks
+straight to the page through an index and never counts. With page numbers,
+clients that do not need the total can still skip the count with
+`?count=false`.
+"""
+
+
+class UncountedPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super(UncountedPage, self).__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def __repr__(self):
+        return '<Page %s>' % self.number
+
+    def has_next(self):
+        return self._has_next
+
+
+class UncountedPaginator(Paginator):
+    """
+    A paginator that never counts its objects; it reads one row past the
+    end of each page to find out whether there is another one.
+    """
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise InvalidPage('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return UncountedPage(rows[:self.per_page], number, self,
+                             len(rows) > self.per_page)
+
+
+class CountOptionalPagination(PageNumberPagination):
+    """
+    Page number pagination that leaves out `count` when the request asks
+    for `?count=false`.
+    """
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.counted = request.query_params.get(
+            self.count_query_param, '').lower() not in ('false', '0')
+        if self.counted:
+            return super(CountOptionalPagination, self).paginate_queryset(
+                queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            self.page = UncountedPaginator(queryset, page_size).page(
+                page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=six.text_type(exc)
+            )
+            raise NotFound(msg)
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.counted:
+            return super(CountOptionalPagination,
+                         self).get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class SnippetCursorPagination(CursorPagination):
+    # Matches `Snippet.Meta.ordering`, with the primary key to break ties,
+    # and the `(created, id)` index.
+    ordering = ('created', 'pk')
+
+    def _get_position_from_instance(self, instance, ordering):
+        # Rows may be `.values()` dicts (see `ValuesMixin`).
+        if isinstance(instance, dict):
+            return six.text_type(instance[ordering[0].lstrip('-')])
+        return super(SnippetCursorPagination,
+                     self)._get_position_from_instance(instance, ordering)
+
+
+class UserCursorPagination(CursorPagination):
+    ordering = ('pk',)
+
+
+class PaginationModeMixin(object):
+    """
+    Use `cursor_pagination_class` when `SNIPPETS_PAGINATION` is 'cursor',
+    and page numbers otherwise.
+    """
+    cursor_pagination_class = None
+
+    @property
+    def pagination_class(self):
+        mode = getattr(settings, 'SNIPPETS_PAGINATION', 'page')
+        if mode == 'cursor' and self.cursor_pagination_class is not None:
+            return self.cursor_pagination_class
+        return CountOptionalPagination
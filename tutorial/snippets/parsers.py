@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.utils import six
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from snippets import jsonlib
+from snippets.renderers import FastJSONRenderer
+
+
+class FastJSONParser(BaseParser):
+    """
+    `JSONParser`, decoding with `snippets.jsonlib` instead of the standard
+    library.
+    """
+    media_type = 'application/json'
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read().decode(encoding)
+            return jsonlib.loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % six.text_type(exc))
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON into a list, one item per line, so large
+    uploads can be produced a record at a time.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        items = []
+        for number, line in enumerate(stream, 1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                items.append(jsonlib.loads(line))
+            except ValueError as exc:
+                raise ParseError('NDJSON parse error on line %d - %s'
+                                 % (number, six.text_type(exc)))
+        return items
@@ -13,4 +13,17 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the snippet.
-        return obj.owner == request.user
+        # Comparing ids saves fetching the owner's row.
+        return obj.owner_id == request.user.pk
+
+    def has_objects_permission(self, request, view, queryset, pks):
+        """
+        `has_object_permission` for many objects at once, without loading
+        them: returns a dict mapping each of `pks` found in `queryset` to
+        whether the request may change it, using a single query.
+        """
+        rows = queryset.filter(pk__in=pks).values_list('pk', 'owner_id')
+        if request.method in permissions.SAFE_METHODS:
+            return dict((pk, True) for pk, _ in rows)
+        return dict((pk, owner_id == request.user.pk)
+                    for pk, owner_id in rows)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pygments
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from snippets import highlighting
+
+"""
+Rendered HTML is cached under a hash of every input that affects
+`highlighting.render`, plus the Pygments version, so identical snippets and
+re-saves that leave those inputs alone never reach Pygments.
+
+There are two tiers: a bounded in-process LRU, and the shared cache named by
+the `SNIPPETS_RENDER_CACHE` setting (a database or file based cache, so that
+every worker benefits from a render done by any other).
+"""
+
+
+class LRUCache(object):
+    """
+    A small thread-safe least-recently-used mapping.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return None
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+memory = LRUCache(getattr(settings, 'SNIPPETS_RENDER_CACHE_SIZE', 256))
+_stats = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    """
+    Hit/miss counters for this process.
+    """
+    with _stats_lock:
+        counters = dict(_stats)
+    counters['memory_size'] = len(memory)
+    return counters
+
+
+def reset():
+    """
+    Empty the in-process tier and zero the counters.
+    """
+    memory.clear()
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def shared():
+    alias = getattr(settings, 'SNIPPETS_RENDER_CACHE', None)
+    if not alias:
+        return None
+    try:
+        return caches[alias]
+    except InvalidCacheBackendError:
+        return None
+
+
+def render_key(code, language, style, linenos=False, title='', full=True):
+    """
+    Content address for the HTML `highlighting.render` would produce.
+    """
+    inputs = [pygments.__version__, code, language, style, bool(linenos),
+              title, bool(full)]
+    payload = json.dumps(inputs, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
+
+
+def lookup(key):
+    """
+    Return the cached HTML for `key`, or None.
+    """
+    html = memory.get(key)
+    if html is not None:
+        _count('memory_hits')
+        return html
+    cache = shared()
+    if cache is not None:
+        html = cache.get(key)
+        if html is not None:
+            _count('shared_hits')
+            memory.set(key, html)
+            return html
+    _count('misses')
+    return None
+
+
+def store(key, html):
+    memory.set(key, html)
+    cache = shared()
+    if cache is not None:
+        cache.set(key, html, None)
+
+
+def render(*args):
+    """
+    Cached equivalent of `highlighting.render`.
+    """
+    key = render_key(*args)
+    html = lookup(key)
+    if html is None:
+        html = highlighting.render(*args)
+        store(key, html)
+    return html
+
+
+def render_many(items, processes=None):
+    """
+    Cached equivalent of `highlighting.render_many`; only the misses are
+    sent to the process pool.
+    """
+    items = list(items)
+    keys = [render_key(*item) for item in items]
+    results = [lookup(key) for key in keys]
+    missing = OrderedDict()
+    for i, html in enumerate(results):
+        if html is None:
+            missing.setdefault(keys[i], items[i])
+    rendered = highlighting.render_many(missing.values(), processes)
+    rendered = dict(zip(missing, rendered))
+    for key, html in rendered.items():
+        store(key, html)
+    return [html if html is not None else rendered[key]
+            for key, html in zip(keys, results)]
@@ -0,0 +1,53 @@
+from django.utils import six
+from rest_framework import renderers
+from rest_framework.compat import (INDENT_SEPARATORS, LONG_SEPARATORS,
+                                   SHORT_SEPARATORS)
+from snippets import jsonlib
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    `JSONRenderer`, encoding with `snippets.jsonlib` instead of the standard
+    library.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if indent is None:
+            separators = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+        else:
+            separators = INDENT_SEPARATORS
+
+        ret = jsonlib.dumps(
+            data, cls=self.encoder_class,
+            indent=indent, ensure_ascii=self.ensure_ascii,
+            separators=separators
+        )
+
+        # As in `JSONRenderer`, keep the output a strict JavaScript subset.
+        if isinstance(ret, six.text_type):
+            ret = ret.replace(u'\u2028', u'\\u2028').replace(u'\u2029',
+                                                             u'\\u2029')
+            return bytes(ret.encode('utf-8'))
+        return ret
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    Newline-delimited JSON. Views that stream it return their own
+    `StreamingHttpResponse`, so this only takes part in content negotiation
+    and renders the odd error response, as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        return jsonlib.dumps(data, separators=SHORT_SEPARATORS).encode(
+            'utf-8') + b'\n'
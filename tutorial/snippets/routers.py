@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+from django.core.urlresolvers import NoReverseMatch, reverse
+from rest_framework import views
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+
+
+class CachedDefaultRouter(DefaultRouter):
+    """
+    A `DefaultRouter` whose API root resolves its links once per URL
+    namespace and format, rather than on every request; only the host is
+    filled in per request.
+    """
+
+    def get_api_root_view(self):
+        api_root_dict = OrderedDict()
+        list_name = self.routes[0].name
+        for prefix, viewset, basename in self.registry:
+            api_root_dict[prefix] = list_name.format(basename=basename)
+        paths = {}
+
+        def resolve(namespace, format):
+            resolved = OrderedDict()
+            kwargs = format and {'format': format} or {}
+            for key, url_name in api_root_dict.items():
+                if namespace:
+                    url_name = namespace + ':' + url_name
+                try:
+                    resolved[key] = reverse(url_name, kwargs=kwargs)
+                except NoReverseMatch:
+                    # Don't bail out if eg. no list routes exist, only detail
+                    # routes.
+                    continue
+            return resolved
+
+        class APIRoot(views.APIView):
+            _ignore_model_permissions = True
+
+            def get(self, request, *args, **kwargs):
+                key = (request.resolver_match.namespace,
+                       kwargs.get('format'))
+                if key not in paths:
+                    paths[key] = resolve(*key)
+                return Response(OrderedDict(
+                    (name, request.build_absolute_uri(path))
+                    for name, path in paths[key].items()))
+
+        return APIRoot.as_view()
@@ -0,0 +1,121 @@
+import operator
+from functools import reduce
+
+from django.db import connection
+from django.db.models import Q
+
+"""
+Search over snippet titles, descriptions and code. On SQLite the text is
+indexed in an FTS5 table with the trigram tokenizer (created by migration
+0009), so `?q=` matches any substring of three or more characters through
+the index instead of a `LIKE '%...%'` scan of every row, and results are
+ranked with bm25. `Snippet.save` and the bulk endpoint index what they
+write, and a trigger (migration 0012) drops deleted snippets, however they
+are deleted. Databases without the index fall back to
+`icontains` lookups.
+
+Trigrams can't match anything shorter than three characters, so shorter
+words are matched with `icontains` alongside the index. On SQLite older
+than 3.34, migration 0009 falls back to the default word tokenizer, and the
+index then only matches whole words.
+"""
+
+# The shortest word the trigram index can match.
+MIN_TERM_LENGTH = 3
+
+TABLE = 'snippets_snippet_fts'
+
+_available = {}
+
+
+def available():
+    """
+    Whether the current database has the search index.
+    """
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in _available:
+        _available[key] = (connection.vendor == 'sqlite' and
+                           TABLE in connection.introspection.table_names())
+    return _available[key]
+
+
+def index(snippets):
+    """
+    Add `snippets` to the index, replacing whatever it held for them.
+    """
+    if not snippets or not available():
+        return
+    with connection.cursor() as cursor:
+        unindex([snippet.pk for snippet in snippets], cursor)
+        cursor.executemany(
+            'INSERT INTO %s (rowid, title, description, code) '
+            'VALUES (%%s, %%s, %%s, %%s)' % TABLE,
+            [(snippet.pk, snippet.title, snippet.description, snippet.code)
+             for snippet in snippets])
+
+
+def unindex(pks, cursor=None):
+    """
+    Remove the snippets with primary keys `pks` from the index.
+    """
+    if not pks or not available():
+        return
+    if cursor is None:
+        with connection.cursor() as cursor:
+            return unindex(pks, cursor)
+    cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % TABLE,
+                       [(pk,) for pk in pks])
+
+
+def rebuild():
+    """
+    Index every snippet from scratch.
+    """
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s' % TABLE)
+        cursor.execute('INSERT INTO %s (rowid, title, description, code) '
+                       'SELECT id, title, description, code '
+                       'FROM snippets_snippet' % TABLE)
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query matching every word as a literal
+    string, so that operators and punctuation in the text are not parsed.
+    """
+    return ' '.join('"%s"' % term.replace('"', '""')
+                    for term in query.split())
+
+
+def scan(queryset, query):
+    """
+    The same search without the index: a `LIKE '%...%'` scan of every row.
+    """
+    return queryset.filter(reduce(operator.and_, [
+        Q(title__icontains=term) | Q(description__icontains=term) |
+        Q(code__icontains=term) for term in query.split()]))
+
+
+def search(queryset, query):
+    """
+    Narrow `queryset` to the snippets matching every word of `query`, best
+    match first.
+    """
+    terms = query.split()
+    if not terms:
+        return queryset
+    indexed = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    if not indexed or not available():
+        return scan(queryset, query)
+    short = [term for term in terms if len(term) < MIN_TERM_LENGTH]
+    if short:
+        queryset = scan(queryset, ' '.join(short))
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[TABLE],
+        where=['%s.rowid = %s.id' % (TABLE, table), '%s MATCH %%s' % TABLE],
+        params=[match_expression(' '.join(indexed))],
+        select={'search_rank': '%s.rank' % TABLE},
+    ).order_by('search_rank', 'pk')
@@ -1,5 +1,7 @@
-from rest_framework import serializers
+from rest_framework import permissions, serializers
 from snippets.models import Snippet
+from snippets.relations import (CachedHyperlinkedIdentityField,
+                                CachedHyperlinkedRelatedField)
 from django.contrib.auth.models import User
 
 
@@ -38,12 +40,39 @@ url pattern, instead of the 'snippet-detail' url pattern.
 Because we've included format suffixed URLs such as '.json', we also need to
 indicate on the highlight field that any format suffixed hyperlinks it
 returns should use the '.html' suffix.
+
+The hyperlinked fields used here are the Cached* versions from
+snippets/relations.py, which resolve each route once per request.
 """
 
 
-class SnippetSerializer(serializers.HyperlinkedModelSerializer):
+class SparseFieldsetMixin(object):
+    """
+    Lets read requests ask for a subset of the fields with
+    `?fields=url,title`. Unknown names are ignored.
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super(SparseFieldsetMixin, self).__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return
+        wanted = set(name.strip() for name in requested.split(','))
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+class SnippetSerializer(SparseFieldsetMixin,
+                        serializers.HyperlinkedModelSerializer):
+    serializer_url_field = CachedHyperlinkedIdentityField
+    serializer_related_field = CachedHyperlinkedRelatedField
+
     owner = serializers.ReadOnlyField(source='owner.username')
-    highlight = serializers.HyperlinkedIdentityField(
+    highlight = CachedHyperlinkedIdentityField(
         view_name='snippet-highlight', format='html')
 
     class Meta:
@@ -54,7 +83,10 @@ class SnippetSerializer(serializers.HyperlinkedModelSerializer):
 
 
 class UserSerializer(serializers.HyperlinkedModelSerializer):
-    snippets = serializers.HyperlinkedRelatedField(
+    serializer_url_field = CachedHyperlinkedIdentityField
+    serializer_related_field = CachedHyperlinkedRelatedField
+
+    snippets = CachedHyperlinkedRelatedField(
         many=True, view_name='snippet-detail', read_only=True)
 
     class Meta:
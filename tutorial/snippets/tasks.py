@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from snippets import highlighting, render_cache
+from snippets.models import HighlightJob, Snippet
+
+HIGHLIGHT_FIELDS = ('code', 'language', 'style', 'linenos', 'title')
+
+
+def process_highlight_jobs(limit=100, processes=None):
+    """
+    Render the snippets behind the oldest `limit` queued jobs and store the
+    results. Returns the number of snippets rendered.
+    """
+    jobs = HighlightJob.objects.values_list('id', 'snippet_id')[:limit]
+    latest = {}
+    for job_id, snippet_id in jobs:
+        latest[snippet_id] = max(job_id, latest.get(snippet_id, 0))
+    if not latest:
+        return 0
+
+    rows = list(Snippet.objects.filter(pk__in=list(latest))
+                .values_list('pk', *HIGHLIGHT_FIELDS))
+    full = highlighting.full_documents()
+    inputs = [row[1:] + (full,) for row in rows]
+    results = render_cache.render_many(inputs, processes)
+
+    with transaction.atomic():
+        for row, args, html in zip(rows, inputs, results):
+            pk = row[0]
+            HighlightJob.objects.filter(
+                snippet_id=pk, id__lte=latest[pk]).delete()
+            # The snippet was saved again while we were rendering; leave it
+            # pending for the newer job.
+            if HighlightJob.objects.filter(snippet_id=pk).exists():
+                continue
+            Snippet.objects.filter(pk=pk).update(
+                highlight_pending=False,
+                highlight_key=render_cache.render_key(*args),
+                version=F('version') + 1, modified=timezone.now(),
+                **highlighting.stored(html, args[2], args[4]))
+    return len(rows)
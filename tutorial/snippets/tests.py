@@ -1,3 +1,1203 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+import pygments
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from snippets import (choices, export, highlighting, relations, render_cache,
+                      search)
+from snippets.models import HighlightJob, LANGUAGE_CHOICES, Snippet
+from snippets.parsers import FastJSONParser
+from snippets.permissions import IsOwnerOrReadOnly
+from snippets.renderers import FastJSONRenderer
+from snippets.tasks import process_highlight_jobs
+from snippets.urls import router
+from snippets.views import SnippetViewSet
+from tutorial import timing
+
+
+def create_snippet(owner, code='print "hello"', **kwargs):
+    """
+    Creates a snippet owned by `owner`; any other field can be passed as a
+    keyword argument.
+    """
+    return Snippet.objects.create(owner=owner, code=code, **kwargs)
+
+
+def clear_render_cache():
+    render_cache.reset()
+    render_cache.shared().clear()
+
+
+@override_settings(SNIPPETS_RENDER_CACHE='default',
+                   SNIPPETS_HIGHLIGHT_STORAGE='fragment')
+class AsyncHighlightTests(TestCase):
+    def setUp(self):
+        clear_render_cache()
+        self.user = User.objects.create_user('alice', password='secret')
+
+    def test_sync_save_renders_immediately(self):
+        """
+        By default saving a snippet renders its highlighted HTML straight
+        away and queues nothing.
+        """
+        snippet = create_snippet(self.user)
+        self.assertFalse(snippet.highlight_pending)
+        self.assertIn('<div class="highlight">', snippet.highlighted)
+        self.assertFalse(HighlightJob.objects.exists())
+
+    @override_settings(SNIPPETS_ASYNC_HIGHLIGHT=True)
+    def test_async_save_queues_render(self):
+        """
+        In async mode the highlight view serves a plain-text fallback with a
+        202 until a worker has rendered the snippet.
+        """
+        snippet = create_snippet(self.user, code='x = "<b>"')
+        self.assertTrue(snippet.highlight_pending)
+        self.assertEqual(snippet.highlighted, '')
+        self.assertEqual(HighlightJob.objects.count(), 1)
+
+        url = reverse('snippet-highlight', args=(snippet.pk,))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertContains(response, 'x = &quot;&lt;b&gt;&quot;',
+                            status_code=202)
+
+        self.assertEqual(process_highlight_jobs(processes=1), 1)
+        self.assertFalse(HighlightJob.objects.exists())
+        response = self.client.get(url)
+        self.assertContains(response, '<div class="highlight">')
+
+    @override_settings(SNIPPETS_ASYNC_HIGHLIGHT=True)
+    def test_newer_job_keeps_snippet_pending(self):
+        """
+        A snippet saved again after its job was picked up stays pending until
+        the newer job has been processed.
+        """
+        snippet = create_snippet(self.user)
+        process_highlight_jobs(limit=1, processes=1)
+        snippet.code = 'y = 2'
+        snippet.save()
+        HighlightJob.objects.create(snippet=snippet)
+        self.assertEqual(process_highlight_jobs(limit=1, processes=1), 1)
+        self.assertTrue(Snippet.objects.get(pk=snippet.pk).highlight_pending)
+        process_highlight_jobs(processes=1)
+        snippet = Snippet.objects.get(pk=snippet.pk)
+        self.assertFalse(snippet.highlight_pending)
+        self.assertIn('y', snippet.highlighted)
+
+
+@override_settings(SNIPPETS_RENDER_CACHE='default',
+                   SNIPPETS_HIGHLIGHT_STORAGE='fragment')
+class RenderCacheTests(TestCase):
+    def setUp(self):
+        clear_render_cache()
+        self.user = User.objects.create_user('alice', password='secret')
+
+    def test_key_covers_every_highlight_input(self):
+        """
+        Changing any input to `render` changes the cache key.
+        """
+        base = ('x = 1', 'python', 'friendly', False, '')
+        variants = [('x = 2', 'python', 'friendly', False, ''),
+                    ('x = 1', 'ruby', 'friendly', False, ''),
+                    ('x = 1', 'python', 'monokai', False, ''),
+                    ('x = 1', 'python', 'friendly', True, ''),
+                    ('x = 1', 'python', 'friendly', False, 'T')]
+        keys = set(render_cache.render_key(*args) for args in variants)
+        keys.add(render_cache.render_key(*base))
+        self.assertEqual(len(keys), len(variants) + 1)
+
+    def test_duplicate_snippets_render_once(self):
+        """
+        A second snippet with the same inputs is served from the cache.
+        """
+        first = create_snippet(self.user, code='x = 1')
+        second = create_snippet(self.user, code='x = 1')
+        self.assertEqual(first.highlighted, second.highlighted)
+        counters = render_cache.stats()
+        self.assertEqual(counters['misses'], 1)
+        self.assertEqual(counters['memory_hits'], 1)
+
+    def test_shared_tier_is_consulted(self):
+        """
+        A render cached by another process is found in the shared tier.
+        """
+        create_snippet(self.user, code='x = 1')
+        render_cache.memory.clear()
+        create_snippet(self.user, code='x = 1')
+        self.assertEqual(render_cache.stats()['shared_hits'], 1)
+
+    def test_unchanged_save_skips_render(self):
+        """
+        Saving without touching the highlight inputs does not look up or
+        render anything.
+        """
+        snippet = create_snippet(self.user)
+        render_cache.reset()
+        snippet.description = 'Changed'
+        snippet.save()
+        counters = render_cache.stats()
+        self.assertEqual(counters['misses'] + counters['memory_hits'] +
+                         counters['shared_hits'], 0)
+
+
+class ChoicesTests(TestCase):
+    def test_artifact_matches_pygments(self):
+        """
+        The checked-in artifact is what Pygments itself would produce.
+        `choices.load` falls back to building the tables for any other
+        Pygments version, so the file is read directly here: a stale one
+        has to be regenerated with `build_pygments_choices`.
+        """
+        with open(choices.DEFAULT_ARTIFACT) as f:
+            artifact = json.load(f)
+        self.assertEqual(artifact['pygments'], pygments.__version__,
+                         'Run manage.py build_pygments_choices.')
+        built = choices.build()
+        self.assertEqual(artifact['languages'], built['languages'])
+        self.assertEqual(artifact['styles'], built['styles'])
+
+    def test_choices_validate(self):
+        """
+        Model validation still checks language and style against the
+        lazily loaded tables.
+        """
+        self.assertIn(('python', 'Python'), LANGUAGE_CHOICES)
+        snippet = Snippet(code='x', language='no-such-language',
+                          style='friendly')
+        with self.assertRaises(ValidationError) as cm:
+            snippet.full_clean(exclude=['owner'])
+        self.assertIn('language', cm.exception.message_dict)
+
+
+@override_settings(SNIPPETS_RENDER_CACHE='default')
+class HighlightStorageTests(TestCase):
+    def setUp(self):
+        clear_render_cache()
+        self.user = User.objects.create_user('alice', password='secret')
+
+    @override_settings(SNIPPETS_HIGHLIGHT_STORAGE='fragment')
+    def test_fragment_storage(self):
+        """
+        In fragment mode only the highlighted markup is stored, and the
+        highlight view links the style's shared stylesheet.
+        """
+        snippet = create_snippet(self.user, title='Mine', style='monokai')
+        self.assertTrue(snippet.highlighted.startswith('<div'))
+        self.assertNotIn('<style', snippet.highlighted)
+
+        response = self.client.get(
+            reverse('snippet-highlight', args=(snippet.pk,)))
+        css_url = reverse('snippet-style', args=('monokai',))
+        self.assertContains(response, css_url)
+        self.assertContains(response, snippet.highlighted)
+        self.assertContains(response, '<title>Mine</title>')
+
+    @override_settings(SNIPPETS_HIGHLIGHT_STORAGE='full')
+    def test_full_storage(self):
+        """
+        In full mode the stored document is served as it is.
+        """
+        snippet = create_snippet(self.user)
+        self.assertTrue(snippet.highlighted.startswith('<!DOCTYPE'))
+        response = self.client.get(
+            reverse('snippet-highlight', args=(snippet.pk,)))
+        self.assertEqual(response.content.decode('utf-8'),
+                         snippet.highlighted)
+
+    @override_settings(SNIPPETS_HIGHLIGHT_STORAGE='gzip')
+    def test_gzip_storage(self):
+        """
+        In gzip mode the page is stored compressed and sent as it is to
+        clients that accept gzip; others get it decompressed.
+        """
+        snippet = create_snippet(self.user, title='Mine', style='monokai')
+        self.assertEqual(snippet.highlighted, '')
+        page = highlighting.decompress(snippet.highlighted_gz)
+        self.assertIn('<title>Mine</title>', page)
+        self.assertIn(reverse('snippet-style', args=('monokai',)), page)
+
+        url = reverse('snippet-highlight', args=(snippet.pk,))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content,
+                         bytes(Snippet.objects.get(pk=snippet.pk)
+                               .highlighted_gz))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        etag = response['ETag']
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content.decode('utf-8'), page)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(SNIPPETS_HIGHLIGHT_STORAGE='gzip')
+    def test_gzip_rerender(self):
+        snippet = create_snippet(self.user)
+        Snippet.objects.filter(pk=snippet.pk).update(highlight_key='old')
+        call_command('rerender_snippets', '--processes=1',
+                     '--state-file=%s' % os.path.join(tempfile.mkdtemp(),
+                                                      'state.json'),
+                     stdout=StringIO())
+        snippet = Snippet.objects.get(pk=snippet.pk)
+        self.assertEqual(snippet.highlighted, '')
+        self.assertIn('<div class="highlight">', snippet.highlighted_page())
+
+    def test_stylesheet(self):
+        """
+        Stylesheets are served with long-lived cache headers, and unknown
+        styles are not found.
+        """
+        response = self.client.get(reverse('snippet-style',
+                                           args=('friendly',)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertContains(response, 'body .k')
+        response = self.client.get(reverse('snippet-style',
+                                           args=('no-such-style',)))
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user('user%d' % i)
+                      for i in range(10)]
+
+    def create_snippets(self, count):
+        for i in range(count):
+            create_snippet(self.users[i % len(self.users)])
+
+    def assertListQueries(self, url, num):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_snippet_list_is_constant(self):
+        """
+        Listing snippets takes the same number of queries for a short page
+        as for a full one: a count and one joined select.
+        """
+        self.create_snippets(2)
+        self.assertEqual(
+            len(self.assertListQueries('/snippets/', 2).data['results']), 2)
+        self.create_snippets(20)
+        response = self.assertListQueries('/snippets/', 2)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['owner'], 'user0')
+
+    def test_user_list_is_constant(self):
+        """
+        Listing users prefetches their snippets in a single query.
+        """
+        self.create_snippets(30)
+        response = self.assertListQueries('/users/', 3)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(response.data['results'][0]['snippets']), 3)
+        User.objects.filter(pk__in=[u.pk for u in self.users[2:]]).delete()
+        response = self.assertListQueries('/users/', 3)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        for i in range(25):
+            create_snippet(self.user, title='Snippet %d' % i)
+
+    def collect(self, url, key='title'):
+        values = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            values.extend(row[key] for row in response.data['results'])
+            url = response.data['next']
+        return values
+
+    def test_page_numbers_without_count(self):
+        """
+        `?count=false` pages through every snippet without counting them.
+        """
+        with self.assertNumQueries(1):
+            self.client.get('/snippets/?count=false')
+        titles = self.collect('/snippets/?count=false')
+        self.assertEqual(titles, ['Snippet %d' % i for i in range(25)])
+        response = self.client.get('/snippets/?count=false&page=4')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SNIPPETS_PAGINATION='cursor')
+    def test_cursor_pagination(self):
+        """
+        In cursor mode the snippet list is walked in creation order, even
+        when rows share a timestamp.
+        """
+        Snippet.objects.filter(title__in=['Snippet 9', 'Snippet 10',
+                                          'Snippet 11']).update(
+            created=Snippet.objects.get(title='Snippet 9').created)
+        with self.assertNumQueries(1):
+            self.client.get('/snippets/')
+        titles = self.collect('/snippets/')
+        self.assertEqual(titles, ['Snippet %d' % i for i in range(25)])
+
+    @override_settings(SNIPPETS_PAGINATION='cursor')
+    def test_user_cursor_pagination(self):
+        for i in range(12):
+            User.objects.create_user('user%d' % i)
+        usernames = self.collect('/users/', key='username')
+        self.assertEqual(usernames,
+                         ['alice'] + ['user%d' % i for i in range(12)])
+
+
+class ListColumnsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        create_snippet(self.user, title='First', code='x = 1')
+
+    def list_sql(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, context.captured_queries[-1]['sql']
+
+    def test_list_skips_highlighted(self):
+        """
+        The list never loads the highlighted HTML, which it does not output.
+        """
+        response, sql = self.list_sql('/snippets/')
+        self.assertNotIn('"highlighted"', sql)
+        self.assertIn('"code"', sql)
+        self.assertEqual(response.data['results'][0]['owner'], 'alice')
+
+    def test_sparse_fieldset(self):
+        """
+        `?fields=` trims both the payload and the columns loaded.
+        """
+        response, sql = self.list_sql('/snippets/?fields=url,title,owner')
+        self.assertEqual(sorted(response.data['results'][0]),
+                         ['owner', 'title', 'url'])
+        self.assertNotIn('"code"', sql)
+        self.assertNotIn('"description"', sql)
+        self.assertIn('"username"', sql)
+
+    def test_detail_is_unaffected(self):
+        snippet = Snippet.objects.get()
+        response = self.client.get('/snippets/%d/' % snippet.pk)
+        self.assertEqual(response.data['code'], 'x = 1')
+        response = self.client.get('/snippets/%d/?fields=title' % snippet.pk)
+        self.assertEqual(list(response.data), ['title'])
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.snippet = create_snippet(self.user, code='x = 1')
+        self.url = reverse('snippet-detail', args=(self.snippet.pk,))
+
+    def test_etag_round_trip(self):
+        """
+        A matching If-None-Match gets a 304 without loading the snippet.
+        """
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(etag, '"%d-1-json"' % self.snippet.pk)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.snippet.code = 'x = 2'
+        self.snippet.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_per_representation(self):
+        """
+        Other formats and field subsets of the same version are tagged
+        differently, and a tag for one does not revalidate another.
+        """
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'fields': 'title,code'})
+        self.assertEqual(response['ETag'],
+                         '"%d-1-json.code.title"' % self.snippet.pk)
+        self.assertIn('Accept', response['Vary'])
+        response = self.client.get(self.url, HTTP_ACCEPT='text/html',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"%d-1-api"' % self.snippet.pk)
+        response = self.client.get(self.url, {'fields': 'title'},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.url)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_highlight_etag(self):
+        url = reverse('snippet-highlight', args=(self.snippet.pk,))
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_match(self):
+        """
+        An update naming an old version is refused; one naming the current
+        version goes through and returns the new ETag.
+        """
+        self.client.login(username='alice', password='secret')
+        etag = self.client.get(self.url)['ETag']
+        data = json.dumps({'code': 'y = 1'})
+        response = self.client.patch(self.url, data,
+                                     content_type='application/json',
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"%d-2-json"' % self.snippet.pk)
+        response = self.client.patch(self.url, data,
+                                     content_type='application/json',
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Snippet.objects.get().version, 2)
+
+
+@override_settings(SNIPPETS_RENDER_CACHE='default',
+                   SNIPPETS_HIGHLIGHT_STORAGE='fragment')
+class BulkTests(TestCase):
+    def setUp(self):
+        clear_render_cache()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.other = User.objects.create_user('bob', password='secret')
+        self.client.login(username='alice', password='secret')
+
+    def bulk(self, method, items, ndjson=False):
+        if ndjson:
+            body = '\n'.join(json.dumps(item) for item in items)
+            content_type = 'application/x-ndjson'
+        else:
+            body = json.dumps(items)
+            content_type = 'application/json'
+        response = getattr(self.client, method)(
+            '/snippets/bulk/', body, content_type=content_type)
+        self.assertEqual(response.status_code, 200)
+        return [result['status'] for result in response.data['results']]
+
+    def test_bulk_create(self):
+        """
+        Valid items are created and highlighted; invalid ones are reported
+        without stopping the rest.
+        """
+        statuses = self.bulk('post', [
+            {'code': 'a = 1', 'title': 'A'},
+            {'code': 'b = 1', 'language': 'no-such-language'},
+            {'code': 'c = 1', 'title': 'C', 'linenos': True},
+        ])
+        self.assertEqual(statuses, [201, 400, 201])
+        snippets = list(Snippet.objects.order_by('pk'))
+        self.assertEqual([s.title for s in snippets], ['A', 'C'])
+        for snippet in snippets:
+            self.assertEqual(snippet.owner, self.user)
+            self.assertIn('<span', snippet.highlighted)
+            self.assertEqual(snippet.highlight_key, render_cache.render_key(
+                *snippet.highlight_inputs()))
+
+    def test_bulk_create_returns_urls(self):
+        create_snippet(self.user)
+        response = self.client.post(
+            '/snippets/bulk/', json.dumps([{'code': 'x'}, {'code': 'y'}]),
+            content_type='application/json')
+        urls = [result['url'] for result in response.data['results']]
+        for url, snippet in zip(urls, Snippet.objects.order_by('pk')[1:]):
+            self.assertTrue(url.endswith('/snippets/%d/' % snippet.pk))
+            self.assertEqual(self.client.get(url).data['code'],
+                             snippet.code)
+
+    def test_bulk_create_ndjson(self):
+        statuses = self.bulk('post', [{'code': 'a'}, {'code': 'b'}],
+                             ndjson=True)
+        self.assertEqual(statuses, [201, 201])
+
+    @override_settings(SNIPPETS_ASYNC_HIGHLIGHT=True)
+    def test_bulk_create_async(self):
+        self.bulk('post', [{'code': 'a'}, {'code': 'b'}])
+        self.assertEqual(HighlightJob.objects.count(), 2)
+        self.assertTrue(all(Snippet.objects.values_list(
+            'highlight_pending', flat=True)))
+
+    def test_bulk_update_and_delete(self):
+        """
+        Updates and deletes only touch the user's own snippets.
+        """
+        mine = create_snippet(self.user, code='a = 1')
+        theirs = create_snippet(self.other, code='b = 1')
+        statuses = self.bulk('patch', [
+            {'id': mine.pk, 'code': 'a = 2'},
+            {'id': theirs.pk, 'code': 'b = 2'},
+            {'id': 999, 'code': 'c = 2'},
+            {'code': 'd = 2'},
+        ])
+        self.assertEqual(statuses, [200, 403, 404, 400])
+        mine = Snippet.objects.get(pk=mine.pk)
+        self.assertEqual(mine.code, 'a = 2')
+        self.assertEqual(mine.version, 2)
+        self.assertIn('2', mine.highlighted)
+        self.assertEqual(Snippet.objects.get(pk=theirs.pk).code, 'b = 1')
+
+        self.assertEqual(self.bulk('delete', [mine.pk, theirs.pk]),
+                         [204, 403])
+        self.assertEqual(list(Snippet.objects.values_list('pk', flat=True)),
+                         [theirs.pk])
+
+    def test_bulk_partial_update(self):
+        """
+        PATCH only needs the fields being changed; PUT needs them all.
+        """
+        mine = create_snippet(self.user, code='a = 1', title='old')
+        self.assertEqual(self.bulk('patch', [{'id': mine.pk,
+                                              'title': 'new'}]), [200])
+        mine = Snippet.objects.get(pk=mine.pk)
+        self.assertEqual((mine.title, mine.code), ('new', 'a = 1'))
+        self.assertEqual(self.bulk('put', [{'id': mine.pk,
+                                            'title': 'newer'}]), [400])
+        self.assertEqual(Snippet.objects.get(pk=mine.pk).title, 'new')
+
+    def test_bulk_update_fields(self):
+        """
+        Updates only write the columns that changed, and bump the version
+        in the database rather than writing back the one they read.
+        """
+        mine = create_snippet(self.user, code='a = 1', title='old')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.bulk('patch', [{'id': mine.pk,
+                                                  'title': 'new'}]), [200])
+        update, = [query['sql'] for query in queries
+                   if 'UPDATE "snippets_snippet" SET' in query['sql']]
+        self.assertNotIn('"code"', update)
+        self.assertNotIn('"description"', update)
+        self.assertIn('"version" = ("snippets_snippet"."version" +', update)
+        self.assertEqual(Snippet.objects.get(pk=mine.pk).version, 2)
+
+    def test_bulk_requires_list(self):
+        response = self.client.post('/snippets/bulk/',
+                                    json.dumps({'code': 'a'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        for i in range(5):
+            create_snippet(self.user, title='Snippet %d' % i)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_export(self):
+        response = self.client.get('/snippets/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in
+                self.read(response).splitlines()]
+        self.assertEqual([row['title'] for row in rows],
+                         ['Snippet %d' % i for i in range(5)])
+        self.assertEqual(rows[0]['owner'], 'alice')
+        self.assertNotIn('highlighted', rows[0])
+
+    def test_json_export(self):
+        rows = json.loads(self.read(
+            self.client.get('/snippets/export/?output=json')))
+        self.assertEqual(len(rows), 5)
+
+    def test_negotiated_export(self):
+        """
+        The export format can also be picked with the Accept header.
+        """
+        response = self.client.get('/snippets/export/',
+                                   HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(self.read(response).splitlines()), 5)
+        response = self.client.get('/snippets/export/',
+                                   HTTP_ACCEPT='application/json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(json.loads(self.read(response))), 5)
+        response = self.client.get('/snippets/export/?output=csv')
+        self.assertEqual(response.status_code, 404)
+
+    def test_since_watermark(self):
+        """
+        Only snippets changed at or after the watermark are exported.
+        """
+        snippet = Snippet.objects.get(title='Snippet 2')
+        snippet.description = 'Changed'
+        snippet.save()
+        response = self.client.get('/snippets/export/',
+                                   {'since': snippet.modified.isoformat()})
+        rows = [json.loads(line) for line in
+                self.read(response).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Snippet 2'])
+        response = self.client.get('/snippets/export/', {'since': 'soon'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', json.loads(response.content.decode())['detail'])
+
+    def test_chunks(self):
+        """
+        Rows are read in keyset chunks and every row comes out exactly once.
+        """
+        Snippet.objects.update(modified=timezone.now())
+        with self.assertNumQueries(3):
+            rows = list(export.rows(chunk_size=2))
+        self.assertEqual(sorted(row['title'] for row in rows),
+                         ['Snippet %d' % i for i in range(5)])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_snippets', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+
+
+@override_settings(SNIPPETS_HIGHLIGHT_STORAGE='fragment')
+class RerenderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.state_file = os.path.join(tempfile.mkdtemp(), 'state.json')
+
+    def rerender(self, *args):
+        out = StringIO()
+        call_command('rerender_snippets', '--processes=1',
+                     '--state-file=%s' % self.state_file, *args, stdout=out)
+        return out.getvalue()
+
+    def test_rerenders_stale_snippets(self):
+        """
+        Only snippets whose stored render no longer matches their inputs are
+        rendered again, and each of those gets a new version.
+        """
+        stale = create_snippet(self.user, style='emacs')
+        fresh = create_snippet(self.user)
+        Snippet.objects.filter(pk=stale.pk).update(highlighted='old',
+                                                   highlight_key='old')
+        output = self.rerender('--style=emacs')
+        self.assertIn('re-rendered 1 ', output)
+        stale.refresh_from_db()
+        self.assertIn('<div class="highlight">', stale.highlighted)
+        self.assertEqual(stale.version, 2)
+        self.assertEqual(Snippet.objects.get(pk=fresh.pk).version, 1)
+        self.assertFalse(os.path.exists(self.state_file))
+
+    def test_resume(self):
+        """
+        A resumed run starts after the last recorded chunk.
+        """
+        first, second = [create_snippet(self.user) for _ in range(2)]
+        Snippet.objects.update(highlight_key='old')
+        with open(self.state_file, 'w') as f:
+            json.dump({'last_pk': first.pk}, f)
+        self.assertIn('Scanned 1 ', self.rerender('--resume'))
+        self.assertEqual(Snippet.objects.get(pk=first.pk).version, 1)
+        self.assertEqual(Snippet.objects.get(pk=second.pk).version, 2)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        if not search.available():
+            self.skipTest('SQLite was built without FTS5.')
+        self.alice = User.objects.create_user('alice', password='secret')
+        self.bob = User.objects.create_user('bob', password='secret')
+        create_snippet(self.alice, title='Fibonacci',
+                       code='def fibonacci(n): pass')
+        create_snippet(self.bob, title='Sorting', language='c',
+                       code='void quicksort(int *xs);',
+                       description='Fibonacci numbers come later.')
+        create_snippet(self.bob, title='Hello', code='print "hello"')
+
+    def titles(self, **params):
+        response = self.client.get('/snippets/', params)
+        return [row['title'] for row in response.data['results']]
+
+    def test_search(self):
+        """
+        Words match substrings of the title, description or code, and the
+        best match comes first.
+        """
+        self.assertEqual(self.titles(q='fibonacci'), ['Fibonacci', 'Sorting'])
+        self.assertEqual(self.titles(q='ickso'), ['Sorting'])
+        self.assertEqual(self.titles(q='fibonacci pass'), ['Fibonacci'])
+        self.assertEqual(self.titles(q='") OR'), [])
+
+    def test_short_words(self):
+        """
+        Words too short for the trigram index still match substrings.
+        """
+        create_snippet(self.alice, title='ab', code='if z: go()')
+        for q in ('if', 'ab', 'go', 'z'):
+            self.assertEqual(self.titles(q=q), ['ab'], q)
+        self.assertEqual(self.titles(q='fibonacci n'),
+                         ['Fibonacci', 'Sorting'])
+        self.assertEqual(self.titles(q='fibonacci xs'), ['Sorting'])
+        self.assertEqual(self.titles(q='print go'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.titles(q='fibonacci', language='c'),
+                         ['Sorting'])
+        self.assertEqual(self.titles(q='fibonacci', owner='alice'),
+                         ['Fibonacci'])
+
+    def test_index_follows_writes(self):
+        snippet = Snippet.objects.get(title='Hello')
+        snippet.code = 'print "goodbye"'
+        snippet.save()
+        self.assertEqual(self.titles(q='hello'), ['Hello'])
+        self.assertEqual(self.titles(q='goodbye'), ['Hello'])
+        snippet.delete()
+        self.assertEqual(self.titles(q='goodbye'), [])
+
+        self.client.login(username='bob', password='secret')
+        self.client.post('/snippets/bulk/',
+                         json.dumps([{'code': 'zebra = 1'}]),
+                         content_type='application/json')
+        self.assertEqual(self.titles(q='zebra'), [''])
+
+    def test_cascade_unindexes(self):
+        """
+        Snippets deleted along with their owner, or by a queryset, leave
+        the index too.
+        """
+        def indexed():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT rowid FROM %s ORDER BY rowid'
+                               % search.TABLE)
+                return [row[0] for row in cursor.fetchall()]
+
+        self.bob.delete()
+        self.assertEqual(indexed(), list(Snippet.objects.values_list(
+            'pk', flat=True)))
+        Snippet.objects.all().delete()
+        self.assertEqual(indexed(), [])
+
+    def test_served_from_index(self):
+        """
+        The search reads the full-text index rather than scanning snippets.
+        """
+        queryset = search.search(Snippet.objects.all(), 'fibonacci')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('VIRTUAL TABLE INDEX', plan)
+        self.assertNotIn('SCAN snippets_snippet ', plan + ' ')
+
+
+class FilterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='secret')
+        self.bob = User.objects.create_user('bob', password='secret')
+        create_snippet(self.alice, title='First')
+        create_snippet(self.bob, title='Second', language='c', style='emacs')
+        create_snippet(self.alice, title='Third', style='emacs')
+
+    def titles(self, **params):
+        response = self.client.get('/snippets/', params)
+        return [row['title'] for row in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.titles(language='c'), ['Second'])
+        self.assertEqual(self.titles(style='emacs'), ['Second', 'Third'])
+        self.assertEqual(self.titles(owner='alice', style='emacs'),
+                         ['Third'])
+        second = Snippet.objects.get(title='Second').created.isoformat()
+        self.assertEqual(self.titles(created_after=second),
+                         ['Second', 'Third'])
+        self.assertEqual(self.titles(created_before=second), ['First'])
+        response = self.client.get('/snippets/', {'created_after': 'never'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ordering(self):
+        self.assertEqual(self.titles(ordering='-created'),
+                         ['Third', 'Second', 'First'])
+        Snippet.objects.get(title='First').save()
+        self.assertEqual(self.titles(ordering='-modified')[0], 'First')
+        # Only indexed fields can be ordered by.
+        self.assertEqual(self.titles(ordering='-title'),
+                         ['First', 'Second', 'Third'])
+
+    @override_settings(SNIPPETS_PAGINATION='cursor')
+    def test_cursor_ordering(self):
+        with self.assertNumQueries(1):
+            titles = self.titles(ordering='-modified')
+        self.assertEqual(titles, ['Third', 'Second', 'First'])
+
+    def test_filters_use_indexes(self):
+        """
+        Every supported filter is answered by searching an index, and every
+        ordering by reading one in order: no table scans and no sorts.
+        """
+        cases = [{'language': 'c'}, {'style': 'emacs'}, {'owner': 'alice'},
+                 {'created_after': '2000-01-01T00:00:00Z'},
+                 {'created_before': '2100-01-01T00:00:00Z'},
+                 {'ordering': '-created'}, {'ordering': 'modified'},
+                 {'language': 'c', 'ordering': '-created'}]
+        factory = APIRequestFactory()
+        for params in cases:
+            request = Request(factory.get('/snippets/', params))
+            view = SnippetViewSet(request=request, action='list',
+                                  format_kwarg=None)
+            queryset = view.filter_queryset(view.get_queryset())
+            sql, sql_params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, sql_params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            filtered = set(params) != set(['ordering'])
+            for step in plan:
+                if 'snippets_snippet' in step:
+                    self.assertIn('INDEX', step, (params, plan))
+                    if filtered:
+                        self.assertTrue(step.startswith('SEARCH'),
+                                        (params, plan))
+                self.assertNotIn('TEMP B-TREE', step, (params, plan))
+
+
+class PermissionTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='secret')
+        self.bob = User.objects.create_user('bob', password='secret')
+        self.client.login(username='alice', password='secret')
+
+    def request(self, method):
+        request = Request(getattr(APIRequestFactory(), method)('/snippets/'))
+        request.user = self.alice
+        return request
+
+    def test_object_permission_loads_no_owner(self):
+        snippet = Snippet.objects.get(pk=create_snippet(self.bob).pk)
+        permission = IsOwnerOrReadOnly()
+        with self.assertNumQueries(0):
+            self.assertTrue(permission.has_object_permission(
+                self.request('get'), None, snippet))
+            self.assertFalse(permission.has_object_permission(
+                self.request('delete'), None, snippet))
+
+    def test_objects_permission(self):
+        mine = create_snippet(self.alice).pk
+        theirs = create_snippet(self.bob).pk
+        permission = IsOwnerOrReadOnly()
+        with self.assertNumQueries(1):
+            allowed = permission.has_objects_permission(
+                self.request('delete'), None, Snippet.objects.all(),
+                [mine, theirs, 0])
+        self.assertEqual(allowed, {mine: True, theirs: False})
+
+    def test_write_checks_one_user_query(self):
+        """
+        Changing a snippet only reads the requesting user, never the owner.
+        """
+        snippet = create_snippet(self.alice)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete('/snippets/%d/' % snippet.pk)
+        self.assertEqual(response.status_code, 204)
+        user_queries = [query for query in context.captured_queries
+                        if 'FROM "auth_user"' in query['sql']]
+        self.assertEqual(len(user_queries), 1)
+
+    def test_bulk_delete_authorizes_in_one_query(self):
+        """
+        A bulk delete checks ownership with the same number of queries
+        however many snippets it names.
+        """
+        def delete(count):
+            pks = [create_snippet(self.alice).pk for _ in range(count)]
+            pks.append(create_snippet(self.bob).pk)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.delete(
+                    '/snippets/bulk/', json.dumps(pks),
+                    content_type='application/json')
+            statuses = [result['status']
+                        for result in response.data['results']]
+            self.assertEqual(statuses, [204] * count + [403])
+            return len(context.captured_queries)
+
+        self.assertEqual(delete(2), delete(10))
+
+
+class HyperlinkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.snippet = create_snippet(self.user)
+
+    def test_cached_reverse_matches_reverse(self):
+        request = Request(APIRequestFactory().get('/snippets/'))
+        for view_name, format in [('snippet-detail', None),
+                                  ('snippet-highlight', 'html'),
+                                  ('user-detail', 'json')]:
+            for pk in (1, 42):
+                expected = relations.drf_reverse(
+                    view_name, kwargs={'pk': pk}, request=request,
+                    format=format)
+                self.assertEqual(relations.reverse(
+                    view_name, kwargs={'pk': pk}, request=request,
+                    format=format), expected)
+        self.assertEqual(len(request._url_templates), 3)
+
+    def test_links(self):
+        response = self.client.get('/snippets/%d.json' % self.snippet.pk)
+        self.assertEqual(response.data['url'],
+                         'http://testserver/snippets/%d.json'
+                         % self.snippet.pk)
+        self.assertEqual(response.data['highlight'],
+                         'http://testserver/snippets/%d/highlight.html'
+                         % self.snippet.pk)
+        response = self.client.get('/users/%d/' % self.user.pk)
+        self.assertEqual(response.data['snippets'],
+                         ['http://testserver/snippets/%d/'
+                          % self.snippet.pk])
+
+    def test_api_root(self):
+        for suffix in ('', '.json', ''):
+            response = self.client.get('/%s' % suffix,
+                                       HTTP_ACCEPT='application/json')
+            self.assertEqual(response.data, {
+                'snippets': 'http://testserver/snippets%s' % (suffix or '/'),
+                'users': 'http://testserver/users%s' % (suffix or '/'),
+            })
+
+
+class JSONTests(TestCase):
+    def payloads(self):
+        user = User.objects.create_user('alice', password='secret')
+        for i in range(3):
+            create_snippet(user, title=u'Snippet \u2603 %d' % i,
+                           code=u'print("\u2028 <b> & / \\\\ \\"")')
+        yield self.client.get('/snippets/').data
+        yield self.client.get('/users/').data
+        yield OrderedDict([
+            ('float', 0.1 + 0.2), ('decimal', Decimal('1.50')),
+            ('when', timezone.now()), ('none', None), ('bool', True),
+            ('nested', [{'a': [1, 2, (3, 4)]}, u'\u2029', 'plain']),
+        ])
+
+    def test_renderer_parity(self):
+        """
+        The fast renderer produces exactly the bytes `JSONRenderer` does,
+        compact or indented, and the parser reads them back the same way.
+        """
+        for data in self.payloads():
+            for media_type in ('application/json',
+                               'application/json; indent=4'):
+                expected = JSONRenderer().render(data, media_type)
+                rendered = FastJSONRenderer().render(data, media_type)
+                self.assertEqual(rendered, expected)
+                self.assertEqual(
+                    FastJSONParser().parse(BytesIO(rendered)),
+                    JSONParser().parse(BytesIO(expected)))
+
+
+class ValuesTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='secret')
+        bob = User.objects.create_user('bob', password='secret')
+        create_snippet(self.alice, title='One', linenos=True)
+        create_snippet(bob, title='Two', language='c', style='emacs',
+                       description=u'caf\xe9', code='int x;')
+        self.snippet = create_snippet(self.alice, title='Search me')
+        self.instances = 0
+        post_init.connect(self.count_instance, sender=Snippet)
+        self.addCleanup(post_init.disconnect, self.count_instance,
+                        sender=Snippet)
+
+    def count_instance(self, **kwargs):
+        self.instances += 1
+
+    def render(self, action, path, fast, **kwargs):
+        view = SnippetViewSet.as_view({'get': action},
+                                      values_fast_path=fast)
+        request = APIRequestFactory().get(path, HTTP_ACCEPT='application/json')
+        response = view(request, **kwargs)
+        response.render()
+        return response.status_code, response.content
+
+    def assertSameOutput(self, action, path, **kwargs):
+        expected = self.render(action, path, False, **kwargs)
+        self.instances = 0
+        self.assertEqual(self.render(action, path, True, **kwargs), expected)
+        self.assertEqual(self.instances, 1 if action == 'retrieve' else 0)
+
+    def test_list_parity(self):
+        """
+        The list renders the same bytes from `.values()` rows, without
+        creating any model instances.
+        """
+        self.assertSameOutput('list', '/snippets/')
+        self.assertSameOutput('list', '/snippets/?fields=url,owner,style')
+        self.assertSameOutput('list', '/snippets/?q=search&ordering=-created')
+        self.assertSameOutput('list', '/snippets/', format='json')
+        with override_settings(SNIPPETS_PAGINATION='cursor'):
+            self.assertSameOutput('list', '/snippets/?ordering=-modified')
+
+    def test_retrieve_parity(self):
+        """
+        Retrieve only creates an instance to check permissions against.
+        """
+        self.assertSameOutput('retrieve', '/snippets/%d/' % self.snippet.pk,
+                              pk=self.snippet.pk)
+        self.assertSameOutput('retrieve', '/snippets/%d.json' %
+                              self.snippet.pk, pk=self.snippet.pk,
+                              format='json')
+        self.assertEqual(self.render('retrieve', '/snippets/0/', True,
+                                     pk=0)[0], 404)
+
+
+@override_settings(TIMING_ENABLED=True, SNIPPETS_RENDER_CACHE='default')
+class TimingTests(TestCase):
+    def setUp(self):
+        clear_render_cache()
+        timing.histograms.clear()
+        self.alice = User.objects.create_user('alice', password='secret')
+        create_snippet(self.alice)
+
+    def test_server_timing(self):
+        response = self.client.get('/snippets/',
+                                   HTTP_ACCEPT='application/json')
+        header = response['Server-Timing']
+        for name in ('db', 'serializer', 'render', 'total'):
+            self.assertIn('%s;dur=' % name, header)
+        self.assertNotIn('pygments', header)
+
+        self.client.login(username='alice', password='secret')
+        response = self.client.post('/snippets/', {'code': 'x = 1'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('pygments;dur=', response['Server-Timing'])
+
+    def test_tagged_by_action(self):
+        self.client.get('/snippets/', HTTP_ACCEPT='application/json')
+        self.client.get('/snippets/', HTTP_ACCEPT='application/json')
+        self.client.get('/snippets/%d/' % Snippet.objects.get().pk,
+                        HTTP_ACCEPT='application/json')
+        self.assertEqual(self.client.get('/__timing__/').status_code, 404)
+
+        User.objects.filter(pk=self.alice.pk).update(is_staff=True)
+        self.client.login(username='alice', password='secret')
+        response = self.client.get('/__timing__/')
+        views = json.loads(response.content.decode('utf-8'))['views']
+        self.assertEqual(views['snippet-list.list']['total']['count'], 2)
+        self.assertEqual(views['snippet-detail.retrieve']['total']['count'],
+                         1)
+
+
+QUERY_BUDGETS = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+
+def router_urls():
+    """
+    The name and a URL of every route the API router generates, leaving out
+    the format suffix variants. Primary keys are those of the first object
+    in the view's queryset.
+    """
+    urls = []
+    for pattern in router.urls:
+        groups = pattern.regex.groupindex
+        if 'format' in groups:
+            continue
+        kwargs = {}
+        if 'pk' in groups:
+            queryset = pattern.callback.cls.queryset
+            kwargs['pk'] = queryset.order_by('pk').values_list(
+                'pk', flat=True)[0]
+        urls.append((pattern.name, reverse(pattern.name, kwargs=kwargs)))
+    return urls
+
+
+@override_settings(SNIPPETS_RENDER_CACHE='default')
+class QueryBudgetTests(TestCase):
+    """
+    Every endpoint the router generates has to run the same number of
+    queries with more rows in the database, and no more than its budget in
+    query_budgets.json. Endpoints that don't answer GET are left out.
+    """
+
+    def seed(self, users, snippets_each):
+        for i in range(users):
+            owner = User.objects.create_user('user%d' % User.objects.count())
+            for j in range(snippets_each):
+                create_snippet(owner, title='Snippet %d' % j)
+
+    def measure(self):
+        counts = {}
+        for name, url in router_urls():
+            cache.clear()
+            clear_render_cache()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(
+                    url, HTTP_ACCEPT='application/json, text/html;q=0.9')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            if response.status_code == 405:
+                continue
+            self.assertEqual(response.status_code, 200, url)
+            counts[name] = len(context.captured_queries)
+        return counts
+
+    def test_query_budgets(self):
+        self.seed(users=2, snippets_each=1)
+        small = self.measure()
+        self.seed(users=6, snippets_each=3)
+        large = self.measure()
+        with open(QUERY_BUDGETS) as f:
+            budgets = json.load(f)
+
+        self.assertEqual(sorted(large), sorted(budgets),
+                         'Every endpoint needs a budget in %s.'
+                         % QUERY_BUDGETS)
+        for name in sorted(large):
+            self.assertEqual(
+                large[name], small[name],
+                '%s ran %d queries with more rows, and %d with fewer.'
+                % (name, large[name], small[name]))
+            self.assertLessEqual(
+                large[name], budgets[name],
+                '%s ran %d queries, over its budget of %d.'
+                % (name, large[name], budgets[name]))
+
+
+class SharedModuleTests(SimpleTestCase):
+    """
+    `timing` and `benchmarking` are copied between this project and the
+    polls one, and the copies must not drift apart.
+    """
+    other = os.path.join(settings.BASE_DIR, os.pardir, 'django_tutorial', 'mysite',
+                         'mysite')
+
+    def test_copies_match(self):
+        if not os.path.isdir(self.other):
+            self.skipTest('The other project is not checked out.')
+        here = os.path.dirname(os.path.abspath(timing.__file__))
+        for name in ('timing.py', 'benchmarking.py'):
+            with open(os.path.join(here, name), 'rb') as f:
+                mine = f.read()
+            with open(os.path.join(self.other, name), 'rb') as f:
+                theirs = f.read()
+            self.assertEqual(mine, theirs,
+                             '%s differs from its copy in %s.'
+                             % (name, self.other))
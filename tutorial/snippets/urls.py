@@ -1,7 +1,7 @@
 from django.conf.urls import url
 from snippets import views
 from django.conf.urls import include
-from rest_framework.routers import DefaultRouter
+from snippets.routers import CachedDefaultRouter
 
 """
 Using Routers
@@ -18,17 +18,20 @@ viewset itself.
 
 The DefaultRouter class we're using also automatically creates the API
 root view for us, so we can now delete the api_root method from our views
-module.
+module. CachedDefaultRouter is a DefaultRouter whose API root only resolves
+its URLs once.
 """
 
 # Create a router and register our viewsets with it.
-router = DefaultRouter()
+router = CachedDefaultRouter()
 router.register(r'snippets', views.SnippetViewSet)
 router.register(r'users', views.UserViewSet)
 
 # The API URLs are now determined automatically by the router.
 # Additionally, we include the login URLs for the browsable API.
 urlpatterns = [
+    url(r'^styles/(?P<style>[\w-]+)\.css$', views.style_css,
+        name='snippet-style'),
     url(r'^', include(router.urls)),
     url(r'^api-auth/', include('rest_framework.urls',
                                namespace='rest_framework'))
@@ -1,12 +1,28 @@
-from snippets.models import Snippet
+from snippets.models import STYLE_CHOICES, Snippet
 from snippets.serializers import SnippetSerializer, UserSerializer
 from rest_framework import permissions
+from snippets.conditional import ConditionalMixin
+from snippets.filters import (SnippetFilter, SnippetOrderingFilter,
+                              SnippetSearchFilter)
+from snippets.mixins import EagerLoadingMixin, ListColumnsMixin, ValuesMixin
+from snippets.negotiation import OutputContentNegotiation
+from snippets.pagination import (PaginationModeMixin, SnippetCursorPagination,
+                                 UserCursorPagination)
+from snippets.parsers import FastJSONParser, NDJSONParser
 from snippets.permissions import IsOwnerOrReadOnly
+from snippets.renderers import FastJSONRenderer, NDJSONRenderer
 from django.contrib.auth.models import User
 from rest_framework.response import Response
 from rest_framework import renderers
+from rest_framework import status
 from rest_framework import viewsets
-from rest_framework.decorators import detail_route
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.exceptions import ParseError
+from snippets import bulk, export, highlighting
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_safe
 
 """
 ViewSet classes are almost the same thing as View classes, except that they
@@ -19,12 +35,14 @@ class which handles the complexities of defining the URL conf for you.
 """
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(ListColumnsMixin, EagerLoadingMixin, PaginationModeMixin,
+                  viewsets.ReadOnlyModelViewSet):
     """
     This viewset automatically provides `list` and `detail` actions.
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    cursor_pagination_class = UserCursorPagination
 
 """
 Here we've used the ReadOnlyModelViewSet class to automatically provide the
@@ -35,22 +53,105 @@ separate classes.
 """
 
 
-class SnippetViewSet(viewsets.ModelViewSet):
+class SnippetViewSet(ConditionalMixin, ValuesMixin, ListColumnsMixin,
+                     EagerLoadingMixin, PaginationModeMixin,
+                     viewsets.ModelViewSet):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
 
-    Additionally we also provide an extra `highlight` action.
+    Additionally we also provide an extra `highlight` action, a `bulk`
+    action that creates, updates or deletes a list of snippets at once, and
+    an `export` action that streams out every snippet.
+
+    The list can be searched with `?q=`, filtered by `?language=`,
+    `?style=`, `?owner=`, `?created_after=` and `?created_before=`, and
+    sorted with `?ordering=` by `created` or `modified`. Reads are served
+    from `.values()` rows (see `ValuesMixin`).
     """
     queryset = Snippet.objects.all()
     serializer_class = SnippetSerializer
+    cursor_pagination_class = SnippetCursorPagination
+    filter_backends = (SnippetFilter, SnippetSearchFilter,
+                       SnippetOrderingFilter)
+    ordering_fields = ('created', 'modified')
+    ordering = ('created',)
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,
                           IsOwnerOrReadOnly,)
 
     @detail_route(renderer_classes=[renderers.StaticHTMLRenderer])
     def highlight(self, request, *args, **kwargs):
+        """
+        In gzip storage mode, clients that accept gzip are sent the stored
+        compressed page as it is.
+        """
+        gzipped = (highlighting.compressed() and
+                   highlighting.accepts_gzip(request))
+        validators = self.get_validators(
+            'highlight-gzip' if gzipped else 'highlight')
+        if validators.not_modified(request):
+            return validators.not_modified_response()
         snippet = self.get_object()
-        return Response(snippet.highlighted)
+        if snippet.highlight_pending:
+            return Response(
+                highlighting.render_plain(snippet.code, snippet.title),
+                status=status.HTTP_202_ACCEPTED)
+        if gzipped and snippet.highlighted_gz:
+            response = HttpResponse(bytes(snippet.highlighted_gz),
+                                    content_type='text/html; charset=utf-8')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(snippet.highlighted_page())
+        if highlighting.compressed():
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return validators.apply(response)
+
+    @list_route(methods=['post', 'put', 'patch', 'delete'],
+                parser_classes=[FastJSONParser, NDJSONParser])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Takes a JSON array, or newline-delimited JSON, of snippets to create
+        (POST), of snippets with their `id` to update (PUT/PATCH), or of ids
+        to delete (DELETE), and returns a result for each item in order.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ParseError('Expected a list of items.')
+        serializer = self.get_serializer(many=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.method == 'POST':
+            results = bulk.create(items, serializer, request)
+        elif request.method == 'DELETE':
+            results = bulk.delete(items, self, queryset)
+        else:
+            results = bulk.update(items, serializer, self, queryset,
+                                  partial=request.method == 'PATCH')
+        return Response({'results': results})
+
+    @list_route(renderer_classes=[NDJSONRenderer, FastJSONRenderer],
+                content_negotiation_class=OutputContentNegotiation)
+    def export(self, request, *args, **kwargs):
+        """
+        Stream every snippet as NDJSON, or as a JSON array when the client
+        accepts `application/json` or asks for `?output=json`.
+        `?since=<timestamp>` limits the export to snippets modified since
+        then.
+        """
+        since = request.query_params.get('since')
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                raise ParseError('Invalid since timestamp.')
+        rows = export.rows(since or None)
+        renderer = request.accepted_renderer
+        if renderer.format == 'json':
+            content = export.json_array(rows)
+        else:
+            content = export.ndjson(rows)
+        response = StreamingHttpResponse(content,
+                                         content_type=renderer.media_type)
+        patch_vary_headers(response, ('Accept',))
+        return response
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -71,3 +172,17 @@ The URLs for custom actions by default depend on the method name itself. If
 you want to change the way url should be constructed, you can include
 url_path as a decorator keyword argument.
 """
+
+
+@require_safe
+def style_css(request, style):
+    """
+    The stylesheet for one Pygments style, linked from highlighted pages
+    whose snippets are stored as fragments.
+    """
+    if (style, style) not in STYLE_CHOICES:
+        raise Http404('Unknown style.')
+    response = HttpResponse(highlighting.stylesheet(style),
+                            content_type='text/css; charset=utf-8')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,99 @@
+import os
+import platform
+import subprocess
+import time
+from contextlib import contextmanager
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+"""
+Helpers for benchmark management commands. Benchmarks run against a
+throwaway test database, so they never touch real data.
+
+This module is copied in tutorial/tutorial/benchmarking.py and
+django_tutorial/mysite/mysite/benchmarking.py, and the tests of both
+projects fail when the two differ.
+"""
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    Create a fresh test database for the duration of the block.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True,
+                                       serialize=False)
+    try:
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+
+
+def timings(func, runs):
+    """
+    Call `func` `runs` times and return its latencies in seconds, sorted.
+    """
+    results = []
+    for _ in range(runs):
+        start = time.time()
+        func()
+        results.append(time.time() - start)
+    return sorted(results)
+
+
+def query_stats(func):
+    """
+    Call `func` once and return how many queries it ran and how long the
+    database spent on them.
+    """
+    # Seeding with DEBUG on can fill the query log, which would confuse
+    # CaptureQueriesContext.
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return {
+        'queries': len(context.captured_queries),
+        'db_ms': round(sum(float(query['time'])
+                           for query in context.captured_queries) * 1000, 3),
+    }
+
+
+def percentile(sorted_values, pct):
+    index = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summary(sorted_values):
+    """
+    Median, 99th percentile and mean of a sorted list of latencies, in
+    milliseconds, and the throughput they add up to, in calls per second.
+    """
+    return {
+        'p50_ms': round(percentile(sorted_values, 50) * 1000, 3),
+        'p99_ms': round(percentile(sorted_values, 99) * 1000, 3),
+        'mean_ms': round(sum(sorted_values) / len(sorted_values) * 1000, 3),
+        'throughput_rps': round(len(sorted_values) / sum(sorted_values), 1),
+    }
+
+
+def environment():
+    """
+    What the results were measured with, so that results from different
+    commits can be told apart.
+    """
+    try:
+        with open(os.devnull, 'w') as devnull:
+            commit = subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], stderr=devnull).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
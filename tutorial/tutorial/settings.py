@@ -42,6 +42,7 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'tutorial.timing.TimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +84,22 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/1.8/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'renders': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'render_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/1.8/topics/i18n/
@@ -110,6 +127,86 @@ results, and allow the API client to step through each of the individual
 pages.
 """
 
+# JSON goes through snippets/jsonlib.py, which uses simplejson's C speedups
+# when simplejson is installed and the standard library otherwise.
 REST_FRAMEWORK = {
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    'DEFAULT_RENDERER_CLASSES': (
+        'snippets.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'snippets.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# 'page' for page numbers, or 'cursor' for keyset pagination of the snippet
+# and user lists (see snippets/pagination.py).
+SNIPPETS_PAGINATION = 'page'
+
+"""
+Highlighting large snippets with Pygments can take a while. When this is
+turned on, saving a snippet only queues the render, and the highlight view
+serves a plain-text version with a 202 until the
+`process_highlight_jobs` command has caught up.
+"""
+
+SNIPPETS_ASYNC_HIGHLIGHT = False
+
+"""
+Rendered snippet HTML is cached by a hash of the highlight inputs: up to
+SNIPPETS_RENDER_CACHE_SIZE entries in each process, backed by the cache
+named here, which every process shares.
+"""
+
+SNIPPETS_RENDER_CACHE = 'renders'
+
+# Tests swap the file based 'renders' cache for an in-memory one.
+TEST_RUNNER = 'tutorial.test_runner.TestRunner'
+
+SNIPPETS_RENDER_CACHE_SIZE = 256
+
+"""
+Store only the highlighted fragment of each snippet ('fragment'), rather
+than a complete HTML document with the style's stylesheet embedded
+('full'). The highlight view links the shared stylesheet instead.
+
+'gzip' stores the page built around the fragment, gzip-compressed, and the
+highlight view sends it as it is to clients that accept gzip.
+"""
+
+SNIPPETS_HIGHLIGHT_STORAGE = 'gzip'
+
+"""
+Per-request timings (see tutorial/timing.py): database time and query
+count, the timers below, and response rendering, sent back in a
+`Server-Timing` header and aggregated per view. The histograms are served
+at TIMING_METRICS_URL (with DEBUG on, to INTERNAL_IPS, or to staff) and, if
+TIMING_METRICS_FILE is set, written there every TIMING_FLUSH_INTERVAL
+seconds. Nothing is timed while this is off.
+"""
+
+TIMING_ENABLED = False
+
+TIMING_INSTRUMENT = {
+    'serializer': (
+        'rest_framework.serializers.BaseSerializer.data',
+        'rest_framework.serializers.BaseSerializer.is_valid',
+        'snippets.mixins.values_representation',
+    ),
+    'pygments': (
+        'snippets.highlighting.highlight',
+        'snippets.highlighting.render_many',
+    ),
+    'template': (
+        'django.template.backends.django.Template.render',
+    ),
 }
+
+TIMING_METRICS_URL = '/__timing__/'
+
+TIMING_METRICS_FILE = None
+
+TIMING_FLUSH_INTERVAL = 10
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+"""
+The shared render cache (`SNIPPETS_RENDER_CACHE`) is a file based cache in
+the project directory. Tests swap it for an in-memory cache, so that they
+neither depend on nor leave behind anything outside the test database.
+"""
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super(TestRunner, self).setup_test_environment(**kwargs)
+        caches = dict(settings.CACHES)
+        caches['renders'] = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'renders',
+        }
+        self.render_cache = override_settings(CACHES=caches)
+        self.render_cache.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.render_cache.disable()
+        super(TestRunner, self).teardown_test_environment(**kwargs)